@@ -29,8 +29,15 @@ available tiling algorithms (as Python modules).
 
 There is also a getter method here, just in case we're looking for an
 option that isn't specified in the config.
+
+Some of the configuration is turned into something faster to use every time
+the config file is (re)loaded. (See Config.compile.) The things that are looked
+up while tiling (for every window!) should be read from Config.SNAPSHOT, not
+with the getters.
 """
 
+import re, collections
+
 class Config:
     #------------------------------------------------------------------------------
     # CONFIGURATION VARIABLES
@@ -46,6 +53,58 @@ class Config:
     CALLBACKS = {}
 
 
+    #------------------------------------------------------------------------------
+    # COMPILED CONFIGURATION (see compile)
+    #------------------------------------------------------------------------------
+
+    #
+    # The window filter, lower cased. Exact class matches are found in the set,
+    # and everything else with one regular expression that looks for all of
+    # the filters at once.
+    #
+    _FILTER_EXACT = set()
+    _FILTER_REGEX = None
+
+    #
+    # Remembers whether each window class (a tuple of its two parts) was
+    # filtered or not. Lots of windows share the same class, so most windows
+    # never even get to the regular expression.
+    #
+    _FILTERED = {}
+
+    #
+    # Everything that's looked up while tiling, with the defaults already
+    # filled in. The fields are:
+    #
+    #    misc     - MISC as a named tuple. (i.e., SNAPSHOT.misc.decorations)
+    #    layouts  - Maps the name of a tiler to a mapping of its LAYOUT options.
+    #    workarea - Maps a screen number to a Workarea, for the screens that
+    #               are in WORKAREA.
+    #    default_workarea - The Workarea for any other screen.
+    #
+    # A Workarea is a named tuple of top, bottom, left and right.
+    #
+    # Note: Nobody can change the snapshot. It's replaced every time the
+    # config file is loaded. Lists in it are tuples, and dicts are _ReadOnly.
+    # (So the snapshot doesn't share anything that the config file could
+    # still change, like MISC['tilers'].)
+    #
+    SNAPSHOT = None
+
+    _Snapshot = collections.namedtuple('Snapshot', 'misc layouts workarea default_workarea')
+    _Workarea = collections.namedtuple('Workarea', 'top bottom left right')
+
+    #
+    # A dict that refuses to be changed. Used for the dicts in the snapshot.
+    #
+    class _ReadOnly(dict):
+        def _read_only(self, *args, **kwargs):
+            raise TypeError("The configuration snapshot can't be changed")
+
+        __setitem__ = __delitem__ = _read_only
+        clear = pop = popitem = setdefault = update = _read_only
+
+
     #------------------------------------------------------------------------------
     # CONFIGURATION DEFAULTS
     #------------------------------------------------------------------------------
@@ -164,6 +223,29 @@ class Config:
     def filter():
         return Config.FILTER
 
+    #
+    # Reports whether a window with the given class (a tuple of two strings) is
+    # filtered. A filter matches if it's anywhere in either part of the class,
+    # ignoring case.
+    #
+    @staticmethod
+    def is_filtered(winclass):
+        if winclass in Config._FILTERED:
+            return Config._FILTERED[winclass]
+
+        first = winclass[0].lower()
+        second = winclass[1].lower()
+
+        if first in Config._FILTER_EXACT or second in Config._FILTER_EXACT:
+            filtered = True
+        elif Config._FILTER_REGEX:
+            filtered = bool(Config._FILTER_REGEX.search(first) or Config._FILTER_REGEX.search(second))
+        else:
+            filtered = False
+
+        Config._FILTERED[winclass] = filtered
+        return filtered
+
     @staticmethod
     def layout(tiler, option):
         layout = tiler.__class__.__name__
@@ -200,6 +282,59 @@ class Config:
             return Config.DEFAULTS['CALLBACKS'][num]
         return None
 
+
+    #------------------------------------------------------------------------------
+    # COMPILING
+    #------------------------------------------------------------------------------
+
+    #
+    # Turns the parts of the configuration that are used all the time into
+    # something faster: the window filter (see is_filtered) and the snapshot
+    # (see SNAPSHOT). This must be called every time the config file is
+    # loaded (or reloaded), since it also forgets everything it remembered
+    # about the old configuration.
+    #
+    @staticmethod
+    def compile():
+        filters = [winfilter.lower() for winfilter in Config.filter()]
+
+        Config._FILTER_EXACT = set(filters)
+        Config._FILTER_REGEX = re.compile('|'.join([re.escape(winfilter) for winfilter in filters])) if filters else None
+        Config._FILTERED = {}
+
+        misc = dict(Config.DEFAULTS['MISC'])
+        misc.update(Config.MISC)
+        misc = collections.namedtuple('Misc', sorted(misc.keys()), rename = True)(*[Config._freeze(misc[name]) for name in sorted(misc.keys())])
+
+        layouts = {}
+        for layout in set(Config.DEFAULTS['LAYOUT'].keys() + Config.LAYOUT.keys()):
+            layouts[layout] = dict(Config.DEFAULTS['LAYOUT'].get(layout, {}))
+            layouts[layout].update(Config.LAYOUT.get(layout, {}))
+        layouts = Config._freeze(layouts)
+
+        default_workarea = Config._Workarea(**Config.DEFAULTS['WORKAREA'][0])
+        workarea = {}
+        for screen in Config.WORKAREA:
+            sides = dict([(side, value) for side, value in Config.WORKAREA[screen].items() if side in Config._Workarea._fields])
+            workarea[screen] = default_workarea._replace(**sides)
+
+        Config.SNAPSHOT = Config._Snapshot(misc, layouts, Config._ReadOnly(workarea), default_workarea)
+
+    #
+    # Makes a copy of a config value that can't be changed: lists (and
+    # tuples) become tuples, sets become frozensets and dicts become
+    # _ReadOnly, all the way down. Anything else is left alone.
+    #
+    @staticmethod
+    def _freeze(value):
+        if isinstance(value, dict):
+            return Config._ReadOnly([(key, Config._freeze(item)) for key, item in value.items()])
+        if isinstance(value, list) or type(value) is tuple:
+            return tuple([Config._freeze(item) for item in value])
+        if isinstance(value, set):
+            return frozenset(value)
+        return value
+
     # Special flag to enable/disable debugging
     #
     # PRIVACY NOTE: This may log the titles of
@@ -31,8 +31,14 @@ from PyTyle.State import State
 from PyTyle.Probe import PROBE
 
 from PyTyle.Viewport import Viewport
+from PyTyle.ScreenIndex import ScreenIndex
+
+class Desktop(object):
+    #
+    # See the note in Window.
+    #
+    __slots__ = ('id', 'resx', 'resy', 'x', 'y', 'width', 'height', 'name', 'viewports', '_VIEWPORT', '_index', '__weakref__')
 
-class Desktop:
     #------------------------------------------------------------------------------
     # STATIC METHODS
     #------------------------------------------------------------------------------
@@ -60,7 +66,8 @@ class Desktop:
                     
     #
     # Simply refreshes the desktop information. Used mainly when the workarea
-    # changes to accomodate docks/panels.
+    # changes to accomodate docks/panels. (This is also when we rebuild the
+    # viewport index- see build_index.)
     #
     @staticmethod
     def refresh_desktops():
@@ -68,6 +75,7 @@ class Desktop:
             if desk['id'] in State.get_desktops():
                 desktop = State.get_desktops()[desk['id']]
                 desktop.update_attributes(desk)
+                desktop.build_index()
                 for viewport in desktop.viewports.values():
                     for screen in viewport.screens.values():
                         screen.needs_tiling()
@@ -104,6 +112,26 @@ class Desktop:
         State.add_desktop(self)
         self.load_viewports()
         
+    #
+    # Builds the index that finds a viewport by x,y coordinates. (Each viewport
+    # builds its own index for its screens when it loads them.) Nothing in the
+    # index changes unless the workarea or screens change, so this is only
+    # done then.
+    #
+    def build_index(self):
+        self._index = ScreenIndex([self.viewports[id] for id in sorted(self.viewports)])
+
+    #
+    # Finds the screen that contains the given x,y coordinates, or None if there
+    # isn't one. This is O(log n), no matter how many viewports and monitors
+    # there are. (See ScreenIndex.)
+    #
+    def find_screen(self, x, y):
+        viewport = self._index.find(x, y)
+        if not viewport:
+            return None
+        return viewport.find_screen(x, y)
+
     #
     # Probes X for all available viewports. For every desktop, an instance
     # of each viewport is newly created. (So the total number of "screens" 
@@ -114,6 +142,8 @@ class Desktop:
         for viewport in viewports:
             obj = Viewport(self, viewport)
             self.viewports[viewport['id']] = obj
+
+        self.build_index()
             
     #
     # Simply updates all the desktop attributes. Currently only used in the
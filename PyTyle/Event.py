@@ -34,26 +34,111 @@ from PyTyle.Debug import DEBUG
 from Xlib import X
 
 class Event:    
+    #------------------------------------------------------------------------------
+    # STATIC METHODS
+    #------------------------------------------------------------------------------
+
+    #
+    # Reads every event that X has sent us so far (without blocking), and
+    # throws out the ones that have been made redundant by a later event:
+    #    1. Only the last ConfigureNotify for each window is kept. (It's the
+    #       only one that describes where the window is *now*.) Real and
+    #       synthetic events are kept apart, though- one of each survives.
+    #       They're in different coordinates (see get_configure_position),
+    #       and the Probe wants to see both when we've resized a window
+    #       (see Probe.is_expected_configure).
+    #    2. Only the last PropertyNotify for each window/property is kept.
+    #       We always re-read the property anyway. This also means a bunch
+    #       of client list changes become one.
+    # Everything else (key presses, etc) is kept. The events that are left
+    # are returned in the order that they (last) happened.
+    #
+    @staticmethod
+    def drain():
+        events = []
+        latest = {}
+
+        while PROBE.pending_events():
+            event = PROBE.get_display().next_event()
+
+            if event.type == X.ConfigureNotify:
+                key = (event.type, event.event.id, event.window.id, bool(event.send_event))
+            elif event.type == X.PropertyNotify:
+                key = (event.type, event.window.id, event.atom)
+            else:
+                key = None
+
+            if key is not None:
+                if key in latest:
+                    events[latest[key]] = None
+                latest[key] = len(events)
+            events.append(event)
+
+        return [Event(event) for event in events if event is not None]
+
+
+    #
+    # Builds a dispatch table out of a dict of handlers. The keys of the given
+    # dict are either the name of an X event type (i.e., "KeyPress"), or the
+    # name of a property- which stands for a PropertyNotify on that property.
+    # The table that comes back is keyed the same way as get_dispatch_key,
+    # so finding the handler for an event is just one lookup.
+    #
+    # Note: Atoms are looked up here, so build the table once and hang on to
+    # it.
+    #
+    @staticmethod
+    def compile_dispatch(handlers):
+        table = {}
+        for name, handler in handlers.items():
+            if isinstance(getattr(X, name, None), int):
+                table[getattr(X, name)] = handler
+            else:
+                table[(X.PropertyNotify, PROBE.atom(name))] = handler
+
+        return table
+
+
     #------------------------------------------------------------------------------
     # CONSTRUCTOR AND INSTANCE METHODS
     #------------------------------------------------------------------------------
     
     #
-    # Each instance represents one event. Upon initialization, we grab that event
-    # from the X server.
+    # Each instance represents one event. If we aren't given one, then we grab
+    # the next event from the X server. (See also drain.)
     #
-    def __init__(self):
-        self._event = PROBE.get_display().next_event()
+    def __init__(self, event = None):
+        if event is None:
+            event = PROBE.get_display().next_event()
+        self._event = event
         
     #
-    # Fetches the window id from the event. We have to convert it to a long and
-    # then a hex so that it matches up with our dictionary of windows (the State).
+    # Fetches the window id from the event. It's a plain integer, just like the
+    # keys in our dictionary of windows (the State).
     #
     def get_window_id(self):
         if self._event and hasattr(self._event, 'window'):
-            return hex(long(self._event.window.id))
+            return self._event.window.id
         return 0
     
+    #
+    # Fetches the window object from the event.
+    #
+    def get_window(self):
+        if self._event and hasattr(self._event, 'window'):
+            return self._event.window
+        return None
+
+    #
+    # Fetches the key to look this event up in a dispatch table. (See
+    # compile_dispatch.) It's the event type, or for a property change, the
+    # event type and the property that changed.
+    #
+    def get_dispatch_key(self):
+        if self._event.type == X.PropertyNotify:
+            return (X.PropertyNotify, self._event.atom)
+        return self._event.type
+
     #
     # Fetches the key code from the event object. Make sure it's a KeyPress event.
     #
@@ -99,25 +184,6 @@ class Event:
         
         return ret
     
-    #
-    # Reports whether this event is an active window changing event.
-    #
-    def is_active_change(self):
-        if self._event and self._event.type == X.PropertyNotify and self._event.atom == PROBE.atom("_NET_ACTIVE_WINDOW"):
-            return True
-        return False
-    
-    #
-    # Reports whether this event is a desktop changing event. This event is
-    # sent from the root window. We use this to update the active window.
-    # Although I am thinking of changing to listening for the
-    # _NET_ACTIVE_WINDOW instead. Will investigate more later.
-    #
-    def is_desktop_change(self):
-        if self._event and self._event.type == X.PropertyNotify and (self._event.atom == PROBE.atom("_NET_CURRENT_DESKTOP") or self._event.atom == PROBE.atom("_NET_DESKTOP_VIEWPORT")):
-            return True
-        return False
-    
     #
     # Reports whether this is a clientMessage.
     #
@@ -154,45 +220,37 @@ class Event:
         return False
     
     #
-    # Reports whether the screen setup has changed by checking the
-    # _NET_DESKTOP_GEOMETRY property.
+    # Reports whether this is a ConfigureNotify event that was caused by our
+    # own resizing. We don't need to do anything about those.
     #
-    def is_screen_change(self):
-        if self._event and self._event.type == X.PropertyNotify and (self._event.atom == PROBE.atom("_NET_DESKTOP_GEOMETRY") or self._event.atom == PROBE.atom("_NET_NUMBER_OF_DESKTOPS")):
+    def is_self_induced(self):
+        if self._event and self._event.type == X.ConfigureNotify and self._event.event != PROBE.get_root() and PROBE.is_expected_configure(self._event):
             return True
         return False
-    
-    #
-    # Reports whether the window's state has changed. If a window's state
-    # changes (i.e., it was hidden or something), then we need to refresh
-    # its information and tell the screen it needs to be retiled.
-    #
-    def is_state_change(self):
-        if self._event and self._event.type == X.PropertyNotify and self._event.atom == PROBE.atom("WM_STATE"):
-            return True
-        return False
-    
+
     #
-    # Reports whether the window manager's client list has changed or not.
-    # Useful for detecting add/removal of windows.
+    # Reports whether this is a window being resized/moved: any ConfigureNotify
+    # that isn't about the root window. (Which events go to which handler is
+    # decided by the dispatch table- see HANDLERS in pytyle. This just weeds
+    # out the root window.)
     #
-    def is_windowlist_change(self):
-        if self._event and self._event.type == X.PropertyNotify and self._event.atom == PROBE.atom("_NET_CLIENT_LIST"):
+    def is_window_move(self):
+        if self._event and self._event.type == X.ConfigureNotify and self._event.event != PROBE.get_root():
             return True
         return False
-    
+
     #
-    # Reports whether the event is a window change or not. We want to know
-    # if the window changes whenever it is resized/moved (ConfigureNotify),
-    # or when its _NET_WM_DESKTOP property changes (PropertyNotify). This
-    # allows for us to drag windows to and from tiling screens (by using
-    # the mouse, keyboard, desktop switch key, etc).
+    # Fetches the window's position from a ConfigureNotify event, in root
+    # coordinates. We can only trust this if the window manager sent the
+    # event (a "synthetic" event)- otherwise, the coordinates are relative
+    # to the window's parent (which is probably a frame). In that case, we
+    # return None and the position needs to be probed.
     #
-    def is_window_change(self):
-        if self._event and ((self._event.type == X.ConfigureNotify and self._event.event != PROBE.get_root()) or (self._event.type == X.PropertyNotify and self._event.atom == PROBE.atom("_NET_WM_DESKTOP"))):
-            return True
-        return False
-    
+    def get_configure_position(self):
+        if self._event and self._event.type == X.ConfigureNotify and self._event.send_event:
+            return (self._event.x, self._event.y)
+        return None
+
     #
     # Reports whether we are creating a window or not. This will initiate
     # a scan for new windows in the client list. Why do we scan? Because
@@ -217,12 +275,3 @@ class Event:
         if self._event and self._event.type == X.DestroyNotify:
             return True
         return False
-    
-    #
-    # Reports whether the workarea has changed (i.e., a dock/panel has
-    # been added to the screen).
-    #
-    def is_workarea_change(self):
-        if self._event and self._event.type == X.PropertyNotify and self._event.atom == PROBE.atom("_NET_WORKAREA"):
-            return True
-        return False
\ No newline at end of file
@@ -0,0 +1,161 @@
+#===============================================================================
+# PyTyle - A manual tiling manager
+# Copyright (C) 2009  Andrew Gallant <andrew@pytyle.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#===============================================================================
+
+"""
+Kernel.py
+
+Cuts rectangles up into cells for the layouts (see Tile._layout). Most layouts
+are made of the same few pieces: a column of windows, a row of windows, or a
+grid of them. Instead of placing windows one at a time, a layout can ask for
+a whole column, row or grid at once.
+
+If NumPy is installed, big batches of cells are worked out with it. Otherwise
+(or if there are only a few windows, where NumPy is actually slower), it's
+done in plain Python. Either way, the cells are exactly the same.
+
+Every cell is a tuple of (x, y, width, height, margin), just like the cells
+that Tile.help_apply expects. The margin is already taken care of, so it's
+always 0.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class Kernel:
+    #------------------------------------------------------------------------------
+    # CLASS VARIABLES
+    #------------------------------------------------------------------------------
+
+    #
+    # Batches with fewer cells than this are done in plain Python, even if we
+    # have NumPy. (Setting up the arrays costs more than it saves.)
+    #
+    NUMPY_THRESHOLD = 64
+
+
+    #------------------------------------------------------------------------------
+    # STATIC METHODS
+    #------------------------------------------------------------------------------
+
+    #
+    # Cuts the given rectangle into "count" cells stacked on top of each other.
+    # Each cell is (height / count) high. If that doesn't divide evenly, the
+    # first (height % count) cells get one more pixel, so the column is filled
+    # all the way to the bottom.
+    #
+    @staticmethod
+    def column(x, y, width, height, count, margin = 0):
+        if not count:
+            return []
+        return Kernel._cells(count, 1, x, y, width, height, margin)
+
+    #
+    # Cuts the given rectangle into "count" cells side by side. Each cell is
+    # (width / count) wide, and the leftover pixels go to the first cells, one
+    # each. (Just like column.)
+    #
+    @staticmethod
+    def row(x, y, width, height, count, margin = 0):
+        if not count:
+            return []
+        return Kernel._cells(count, count, x, y, width, height, margin)
+
+    #
+    # Cuts the given rectangle into rows of "row_size" cells each (the last row
+    # may have fewer). Every row is (height / rows) high. Each cell is
+    # (width / row_size) wide, except in the last row, where the cells are
+    # stretched to fill the whole width. (See HorizontalRows.) Leftover pixels
+    # go to the first rows and the first cells of each row, one each.
+    #
+    @staticmethod
+    def grid(x, y, width, height, count, row_size, margin = 0):
+        if not count:
+            return []
+        return Kernel._cells(count, row_size, x, y, width, height, margin)
+
+
+    #------------------------------------------------------------------------------
+    # PRIVATE STATIC HELPER METHODS
+    #------------------------------------------------------------------------------
+
+    #
+    # The one kernel behind column, row and grid. Cells are laid out left to
+    # right, "per_row" at a time, in as many rows as it takes. The rows split
+    # the height between them, and the cells in each row split the width. (The
+    # last row splits the width between however many cells it has.)
+    #
+    # Splitting "total" pixels "n" ways gives every piece (total / n) pixels,
+    # and one more to each of the first (total % n). So piece i starts at
+    # i * (total / n) + min(i, total % n).
+    #
+    # The margin is applied to every cell here, in one go. (A margin that isn't
+    # positive is ignored, just like in Tile.help_resize.)
+    #
+    @staticmethod
+    def _cells(count, per_row, x, y, width, height, margin):
+        margin = margin if margin > 0 else 0
+
+        rows = (count + per_row - 1) / per_row
+        last_row_size = count - (rows - 1) * per_row
+
+        if numpy is not None and count >= Kernel.NUMPY_THRESHOLD:
+            return Kernel._cells_numpy(count, per_row, rows, last_row_size, x, y, width, height, margin)
+
+        cells = []
+        for i in xrange(count):
+            row, col = divmod(i, per_row)
+            cols = last_row_size if row + 1 == rows else per_row
+
+            top, h = Kernel._split(height, rows, row)
+            left, w = Kernel._split(width, cols, col)
+            cells.append((x + left + margin, y + top + margin, w - 2 * margin, h - 2 * margin, 0))
+        return cells
+
+    #
+    # Same as _cells, but with arrays.
+    #
+    @staticmethod
+    def _cells_numpy(count, per_row, rows, last_row_size, x, y, width, height, margin):
+        row, col = numpy.divmod(numpy.arange(count), per_row)
+        cols = numpy.where(row + 1 == rows, last_row_size, per_row)
+
+        top = row * (height // rows) + numpy.minimum(row, height % rows)
+        h = height // rows + (row < height % rows)
+        left = col * (width // cols) + numpy.minimum(col, width % cols)
+        w = width // cols + (col < width % cols)
+
+        cells = numpy.empty((count, 5), dtype = numpy.result_type(x, y, width, height, margin))
+        cells[:, 0] = x + left + margin
+        cells[:, 1] = y + top + margin
+        cells[:, 2] = w - 2 * margin
+        cells[:, 3] = h - 2 * margin
+        cells[:, 4] = 0
+
+        return [tuple(cell) for cell in cells.tolist()]
+
+    #
+    # Splits "total" pixels "n" ways, and returns the (start, size) of piece
+    # number "i". (See _cells.)
+    #
+    @staticmethod
+    def _split(total, n, i):
+        size, extra = divmod(total, n)
+        return (i * size + min(i, extra), size + (1 if i < extra else 0))
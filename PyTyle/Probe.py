@@ -35,11 +35,62 @@ and a lot more.
 """
 
 from Xlib.display import Display
-from Xlib import X, XK, Xatom, Xutil, protocol
+from Xlib import X, XK, Xatom, Xutil, protocol, error
+from Xlib.protocol import request
+from Xlib.xobject import icccm
 from Xlib.ext import xinerama
-import sys, math
+import sys, math, select
 
 class Probe:
+    #------------------------------------------------------------------------------
+    # CLASS VARIABLES
+    #------------------------------------------------------------------------------
+
+    #
+    # Every atom PyTyle uses. These are all interned in one go when the Probe
+    # starts up (see load_atoms), so that neither the event loop nor probing
+    # a window ever has to wait on the X server for an atom. If you start
+    # using a new atom somewhere, add it here. (It will still work if you
+    # don't, but it will cost a round trip the first time it's used.)
+    #
+    ATOMS = [
+             'WM_STATE',
+             '_NET_ACTIVE_WINDOW',
+             '_NET_CLIENT_LIST',
+             '_NET_CLOSE_WINDOW',
+             '_NET_CURRENT_DESKTOP',
+             '_NET_DESKTOP_GEOMETRY',
+             '_NET_DESKTOP_VIEWPORT',
+             '_NET_FRAME_EXTENTS',
+             '_NET_NUMBER_OF_DESKTOPS',
+             '_NET_SUPPORTING_WM_CHECK',
+             '_NET_WM_DESKTOP',
+             '_NET_WM_NAME',
+             '_NET_WM_STATE',
+             '_NET_WM_STATE_HIDDEN',
+             '_NET_WM_STATE_MAXIMIZED_HORZ',
+             '_NET_WM_STATE_MAXIMIZED_VERT',
+             '_NET_WM_STATE_MODAL',
+             '_NET_WM_STATE_SKIP_PAGER',
+             '_NET_WM_STATE_SKIP_TASKBAR',
+             '_NET_WM_WINDOW_TYPE',
+             '_NET_WM_WINDOW_TYPE_DIALOG',
+             '_NET_WM_WINDOW_TYPE_DOCK',
+             '_NET_WM_WINDOW_TYPE_MENU',
+             '_NET_WM_WINDOW_TYPE_SPLASH',
+             '_NET_WM_WINDOW_TYPE_TOOLBAR',
+             '_NET_WORKAREA',
+             '_OB_WM_STATE_UNDECORATED',
+             '_PYTYLE_REMOTE',
+             ]
+
+    #
+    # How much of a property (in 32 bit units) we ask for when we don't want to
+    # wait around to find out how long it is. Nearly everything we read fits.
+    #
+    PROPERTY_LENGTH = 1024
+
+
     #------------------------------------------------------------------------------
     # CONSTRUCTOR AND INSTANCE METHODS
     #------------------------------------------------------------------------------
@@ -56,6 +107,21 @@ class Probe:
         self._display = Display()
         self._root = self.get_display().screen().root
         self._wm = ''
+        self._atoms = {}
+        self._atom_requests = 0
+        self._transactions = 0
+        self._mirror = {}
+        self._sent = 0
+        self._suppressed = 0
+        self._viewport = None
+        self._viewports = None
+        self._active = None
+        self._dead = set()
+        self._expected = {}
+        self._unflushed = []
+        self._classes = {}
+        self.get_display().set_error_handler(self._handle_error)
+        self.load_atoms()
         self.determine_window_manager()
         self.get_root().change_attributes(event_mask = X.KeyPressMask | X.SubstructureNotifyMask | X.PropertyChangeMask)
 
@@ -64,8 +130,53 @@ class Probe:
     # Display.intern_atom takes a string representation of an atom, and converts
     # it to its proper integer representation- which is what the X protocol uses.
     #
+    # Atoms never change for the life of the X server, so we keep every atom
+    # we've seen in a table. Only the first lookup of an atom that wasn't
+    # interned by load_atoms will ever reach the server.
+    #
     def atom(self, name):
-        return self.get_display().intern_atom(name)
+        if name not in self._atoms:
+            self._atom_requests += 1
+            self._atoms[name] = self.get_display().intern_atom(name)
+        return self._atoms[name]
+
+    #
+    # Interns every atom in Probe.ATOMS. Instead of waiting on a reply for each
+    # atom (which is what Display.intern_atom does), we send all of the
+    # requests first and collect the replies afterwards. That's one round trip
+    # for the whole lot.
+    #
+    def load_atoms(self):
+        pending = []
+        for name in Probe.ATOMS:
+            if name not in self._atoms:
+                self._atom_requests += 1
+                pending.append((name, request.InternAtom(display = self.get_display().display, defer = 1, name = name, only_if_exists = 0)))
+
+        for name, reply in pending:
+            reply.reply()
+            self._atoms[name] = reply.atom
+
+    #
+    # Starts a transaction. Until the matching commit, none of the window_*
+    # methods below will flush the display- every configure, restack and
+    # client message just piles up in the output buffer. Use this whenever
+    # you're about to touch a bunch of windows at once (like tiling a screen),
+    # so that it all goes out to X in one write instead of one per window.
+    #
+    # Transactions can be nested. Only the outermost commit flushes.
+    #
+    def begin(self):
+        self._transactions += 1
+
+    #
+    # Ends a transaction started with begin, and flushes everything queued
+    # up during it.
+    #
+    def commit(self):
+        if self._transactions > 0:
+            self._transactions -= 1
+        self._flush()
 
     #
     # Finds the name of the current window manager.
@@ -127,13 +238,28 @@ class Probe:
     #
     # Note: It's possible that we won't have an active window.
     #
+    # Note 2: The answer is remembered until _NET_ACTIVE_WINDOW changes. (See
+    # invalidate_active_window.) It's wrapped in a tuple, since None is a
+    # perfectly good answer.
+    #
     def get_active_window_id(self):
+        if self._active:
+            return self._active[0]
+
         active = self.get_root().get_full_property(self.atom("_NET_ACTIVE_WINDOW"), 0)
 
         if hasattr(active, 'value'):
-            return hex(active.value[0])
+            self._active = (active.value[0],)
         else:
-            return None
+            self._active = (None,)
+        return self._active[0]
+
+    #
+    # Reports how many InternAtom requests we've sent to the X server. After
+    # start up, this number should hardly ever move.
+    #
+    def get_atom_requests(self):
+        return self._atom_requests
 
     #
     # Queries the window manager for the currently active desktop.
@@ -178,6 +304,14 @@ class Probe:
     def get_display(self):
         return self._display
 
+    #
+    # Reports how many state changing requests (maximize, restore, add/remove
+    # decorations and gravity changes) were actually sent to X, and how many
+    # we skipped because the window was already in that state.
+    #
+    def get_request_stats(self):
+        return {'sent': self._sent, 'suppressed': self._suppressed}
+
     #
     # Returns the current root window.
     #
@@ -228,11 +362,18 @@ class Probe:
     # *relative* to the current viewport, so whenever we resize in a
     # window manager like that, we need to know the current viewport.
     #
+    # Note: This gets called for every geometry read and every resize, so
+    # we remember the answer until X tells us the viewport changed. (See
+    # invalidate_viewport.)
+    #
     def get_viewport(self):
+        if self._viewport:
+            return self._viewport
+
         viewport = self.get_root().get_full_property(self.atom("_NET_DESKTOP_VIEWPORT"), Xatom.CARDINAL)
         if viewport and hasattr(viewport, 'value'):
-            return {'x': viewport.value[0], 'y': viewport.value[1]}
-        return None
+            self._viewport = {'x': viewport.value[0], 'y': viewport.value[1]}
+        return self._viewport
 
     #
     # Retrieves all available viewports. It uses some math trickery, but here's
@@ -249,7 +390,13 @@ class Probe:
     #    5. Assigns id's: go vertical first, then wind back up to the
     #       next column.
     #
+    # Note: Like get_viewport, the result is remembered until the desktop
+    # geometry or workarea changes. (See invalidate_viewports.)
+    #
     def get_viewports(self):
+        if self._viewports:
+            return self._viewports
+
         geom = self.get_root().get_full_property(self.atom("_NET_DESKTOP_GEOMETRY"), Xatom.CARDINAL)
         if self.is_compiz():
             workarea = self.get_root().get_full_property(self.atom("_NET_WORKAREA"), Xatom.CARDINAL)
@@ -277,6 +424,7 @@ class Probe:
                           'y': 0
                           }]
 
+        self._viewports = viewports
         return viewports
 
     #
@@ -289,106 +437,21 @@ class Probe:
     # or screen changed, etc.)
     #
     # Note: There is a lot that goes into this method, so please see the comments
-    # below as well.
+    # in _collect_window as well.
+    #
+    # Note 4: If the window doesn't have a desktop (yet?), it doesn't look like
+    # a real window, and this returns None. If the window is gone, X will
+    # complain with an XError.
     #
     # Note 2: We don't calculate which screen the window is on from here. We do
     # that later (Window.load_window, essentially). However, this method supplies
     # what we need for that calculation- the window's x,y coordinates.
     #
+    # Note 3: All of the requests for a window are sent before we wait on any of
+    # the replies. See get_windows_by_id if you need more than one window.
+    #
     def get_window(self, win):
-        # We don't really need the window name, but it's useful for debugging.
-        # If a window doesn't have a name, or the window manager doesn't
-        # listen to us, then we can still move on.
-        winname = win.get_full_property(self.atom("_NET_WM_NAME"), 0)
-
-        # Another way to find the window name.
-        if not winname:
-            winname = win.get_full_property(Xatom.WM_NAME, 0)
-            if not winname: winname = ''
-
-        if winname: winname = winname.value
-
-        # Fetch the desktop that the window is on. We need this.
-        #
-        # *However* - This could change in the future if we want to support
-        # viewports instead of desktops (*ahem* compiz *ahem*). We might need
-        # to calculate the "desktop" based on the window's x,y coordinates
-        # in the future. (Like we do for screens.)
-        windesk = win.get_full_property(self.atom("_NET_WM_DESKTOP"), 0).value[0]
-
-        # Fetch the window geometry- see the method below for more info.
-        wingeom = self.get_window_geometry(win)
-
-        # Extents are *hopefully* the window decoration sizes. PyTyle will
-        # take these into account when sizing the windows. So far, support
-        # seems pretty good for this from WM's.
-        extents = win.get_full_property(self.atom("_NET_FRAME_EXTENTS"), 0)
-
-        if not extents:
-            extents = [0, 0, 0, 0]
-        else:
-            extents = extents.value
-
-        # We use the normal hints to find the window's gravity. If the
-        # gravity is static, then we need to change it to NorthWest at
-        # some point if we expect the window to behave like we want it to.
-        #
-        # Note: This is obviously a hack. It would be better if we could
-        # *account* for static gravity. Especially since static gravity
-        # is set by the application itself, and if we don't let it have what
-        # it wants, we might get unexpected behavior. So far so good, though.
-        # If anyone has a better understanding of gravity than I do (that is,
-        # beyond the usual man page), then I'd love to talk to you.
-        norm_hints = win.get_wm_normal_hints()
-
-        if norm_hints and norm_hints['win_gravity'] == X.StaticGravity:
-            static = True
-        else:
-            static = False
-
-        # So the transient will tell us a window's parent window. Why do we
-        # care? Because if a top level window creates a child window (i.e.
-        # a popup), then it will hopefully set that child window's transient
-        # property as itself. If we come across transient windows, I don't
-        # think we want to tile them. Sometimes the transient is set to the
-        # root window, in which case it is obviously a window we want to tile.
-        transient = win.get_wm_transient_for()
-
-        if not transient or transient == self.get_root():
-            popup = False
-        else:
-            popup = True
-
-        # If a window is hidden, we don't want to tile it. (Or more importantly,
-        # we don't want PyTyle to *think* there is a window that's there and
-        # isn't.) Check for dock/panel/skip taskbar, etc...
-        #
-        # Note: We check both the "_NET_WM_STATE" (different from "WM_STATE" which
-        # tells us about iconification and stuff) and the "_NET_WM_WINDOW_TYPE".
-        state = win.get_full_property(self.atom("_NET_WM_STATE"), Xatom.ATOM)
-        dock = win.get_full_property(self.atom("_NET_WM_WINDOW_TYPE"), Xatom.ATOM)
-        hidden = False
-
-        if state and (self.atom("_NET_WM_STATE_HIDDEN") in state.value or self.atom("_NET_WM_STATE_SKIP_TASKBAR") in state.value or self.atom("_NET_WM_STATE_SKIP_PAGER") in state.value):
-            hidden = True
-        if dock and (self.atom("_NET_WM_WINDOW_TYPE_DOCK") in dock.value or self.atom("_NET_WM_WINDOW_TYPE_TOOLBAR") in dock.value or self.atom("_NET_WM_WINDOW_TYPE_MENU") in dock.value or self.atom("_NET_WM_WINDOW_TYPE_SPLASH") in dock.value or self.atom("_NET_WM_WINDOW_TYPE_DIALOG") in dock.value):
-            hidden = True
-
-        # Construct the window data structure. This is passed to the
-        # update_attributes method.
-        return {
-                 'id': hex(win.id),
-                 'desktop': int(windesk),
-                 'x': wingeom['x'], 'y': wingeom['y'],
-                 'width': wingeom['width'], 'height': wingeom['height'],
-                 'd_left': extents[0], 'd_right': extents[1],
-                 'd_top': extents[2], 'd_bottom': extents[3],
-                 'title': winname, 'class': win.get_wm_class(),
-                 'static': static,
-                 'popup': popup,
-                 'hidden': hidden,
-                 'xobj': win
-                 }
+        return self._collect_window(win, self._request_window(win))
 
     #
     # Simply fetchs a list of windows from the window manager. The list is
@@ -397,10 +460,8 @@ class Probe:
     #
     def get_windows(self):
         info = {}
-        windows = self.get_window_list()
-
-        for window in windows:
-            info[hex(window)] = self.get_window_by_id(window)
+        for attrs in self.get_windows_by_id(self.get_window_list()):
+            info[attrs['id']] = attrs
 
         return info
 
@@ -411,6 +472,37 @@ class Probe:
         win = self.get_display().create_resource_object("window", window_id)
         return self.get_window(win)
 
+    #
+    # The bulk version of get_window_by_id. Probing a window takes about ten
+    # requests, and if we waited on each of those one at a time, loading a few
+    # hundred windows over a slow connection would take forever. So instead, we
+    # send every request for every window first, and only then start reading
+    # the replies. Returns a list of window attributes in the same order as
+    # the given window id's.
+    #
+    # Note: Windows that disappear while we're probing them (X complains with
+    # an XError), or that don't look like real windows (no desktop- see
+    # _collect_window) are simply left out. Anything else is a bug, and we
+    # let it blow up.
+    #
+    def get_windows_by_id(self, window_ids):
+        pending = []
+        for window_id in window_ids:
+            win = self.get_display().create_resource_object("window", window_id)
+            pending.append((win, self._request_window(win)))
+
+        ret = []
+        for win, requests in pending:
+            try:
+                attrs = self._collect_window(win, requests)
+            except error.XError:
+                continue
+
+            if attrs:
+                ret.append(attrs)
+
+        return ret
+
     #
     # It took me a little bit to figure this one out. So apparently, the
     # get_geometry window method returns coordinates that we don't care about.
@@ -427,22 +519,58 @@ class Probe:
     # removing the call to translate_coords.
     #
     def get_window_geometry(self, win):
-        wingeom = win.get_geometry()
+        return self._collect_geometry(self._request_geometry(win), self._request_translate(win))
 
-        wintrans = win.translate_coords(self.get_root(), wingeom.x, wingeom.y)
-        wintrans.x = -wintrans.x
-        wintrans.y = -wintrans.y
+    #
+    # Fetches the name of the given window. We don't really need it, but it's
+    # useful for debugging (and for sorting windows by name). If a window
+    # doesn't have a name, or the window manager doesn't listen to us, then
+    # we can still move on.
+    #
+    def get_window_title(self, win):
+        net_name = self._request_property(win, self.atom("_NET_WM_NAME"), 0)
+        name = self._request_property(win, Xatom.WM_NAME, 0)
 
-        # This is for compiz (and any other viewport-style WM?)...
-        # looks like we don't need to translate
-        if self.is_compiz():
-            viewport = self.get_viewport()
-            if viewport:
-                wintrans = wingeom
-                wintrans.x += viewport['x']
-                wintrans.y += viewport['y']
+        winname = self._collect_property(win, net_name)
+
+        # Another way to find the window name.
+        if not winname:
+            winname = self._collect_property(win, name)
+
+        if winname:
+            return winname.value
+        return ''
 
-        return {'x': wintrans.x, 'y': wintrans.y, 'width': wingeom.width, 'height': wingeom.height}
+    #
+    # Fetches *only* the desktop of the given window. Use this instead of
+    # get_window when you know that's all that changed. Returns None if the
+    # window doesn't have a desktop anymore. (Some window managers delete
+    # _NET_WM_DESKTOP when a window is withdrawn, or made sticky.)
+    #
+    def get_window_desktop(self, win):
+        desktop = self._collect_property(win, self._request_property(win, self.atom("_NET_WM_DESKTOP"), 0))
+        if not desktop:
+            return None
+        return int(desktop.value[0])
+
+    #
+    # Fetches *only* whether the given window is hidden. (See _collect_window
+    # for what "hidden" means.) This re-reads the window's _NET_WM_STATE,
+    # which also keeps our mirror of it up to date. We usually already know
+    # whether the window is a dock, so that's only asked for if we don't.
+    #
+    def get_window_hidden(self, win):
+        state = self._request_property(win, self.atom("_NET_WM_STATE"), Xatom.ATOM)
+        if win.id in self._mirror:
+            state = self._collect_property(win, state)
+            self._mirror[win.id]['state'] = set(state.value) if state else set()
+            dock = self._mirror[win.id]['dock']
+        else:
+            dock = self._request_property(win, self.atom("_NET_WM_WINDOW_TYPE"), Xatom.ATOM)
+            state = self._collect_property(win, state)
+            dock = self._collect_dock(win, dock)
+
+        return self._is_hidden(state, dock)
 
     #
     # Queries the window manager for a list of window id's. These window id's
@@ -483,6 +611,97 @@ class Probe:
             return True
         return False
 
+    #
+    # Forgets the active window. Call this whenever _NET_ACTIVE_WINDOW changes.
+    #
+    def invalidate_active_window(self):
+        self._active = None
+
+    #
+    # Forgets the current viewport. Call this whenever _NET_CURRENT_DESKTOP
+    # or _NET_DESKTOP_VIEWPORT changes.
+    #
+    def invalidate_viewport(self):
+        self._viewport = None
+
+    #
+    # Forgets the viewport layout (and the current viewport, since it might
+    # not exist anymore). Call this whenever the desktop geometry or the
+    # workarea changes.
+    #
+    def invalidate_viewports(self):
+        self._viewport = None
+        self._viewports = None
+
+    #
+    # Reports whether the given window is still around. This doesn't ask X-
+    # a window is alive until we've been told otherwise, either by a
+    # DestroyNotify (see mark_dead) or by X complaining that the window
+    # doesn't exist anymore (see _handle_error).
+    #
+    def is_alive(self, win):
+        return win.id not in self._dead
+
+    #
+    # Every time we resize a window, X tells us about it. Twice, usually: once
+    # from the window itself, and once from the window manager (a "synthetic"
+    # event). There's no point in refreshing a window just to find out that
+    # it's exactly where we put it, so this reports whether the given
+    # ConfigureNotify event is one of those.
+    #
+    # It has to be:
+    #    1. For a window that we've resized.
+    #    2. Sent after our request, but before X got to anything we sent
+    #       after the request was flushed. (Every event carries the serial
+    #       number of the last request of ours that X had handled.) Sequence
+    #       numbers are only 16 bits, so we compare them modulo 2^16.
+    #    3. The size we asked for.
+    #    4. At the position we asked for. Synthetic events use root
+    #       coordinates, so we give those as much slack as the window's
+    #       decorations. Real events are relative to the parent. If the
+    #       window manager doesn't reparent, that's the root, and it's the
+    #       same check. If it does, the parent is the frame, and the window
+    #       should be sitting right inside its decorations (left, top).
+    #
+    # So an expectation only lives until X has moved past the flush that
+    # sent our request. After that, it's thrown out- whether or not both
+    # events showed up. (Otherwise it might swallow a later ConfigureNotify
+    # that the window manager did on its own, but that happens to have the
+    # same geometry.) It's also thrown out if an event comes in after our
+    # request that *doesn't* match- the window has moved on, and so should
+    # we. Worst case, a window gets refreshed when it didn't need to be.
+    #
+    def is_expected_configure(self, event):
+        if event.window.id not in self._expected:
+            return False
+
+        width, height, x, y, serial, flushed = self._expected[event.window.id]
+        if ((event.sequence_number - serial) & 0xffff) >= 0x8000:
+            return False
+
+        if flushed is not None and 0 < ((event.sequence_number - flushed) & 0xffff) < 0x8000:
+            del self._expected[event.window.id]
+            return False
+
+        extents = [0, 0, 0, 0]
+        if event.window.id in self._mirror:
+            extents = self._mirror[event.window.id]['extents']
+        slackx = extents[0] + extents[1]
+        slacky = extents[2] + extents[3]
+
+        matched = False
+        if event.width == width and event.height == height:
+            if abs(event.x - x) <= slackx and abs(event.y - y) <= slacky:
+                matched = True
+            elif not event.send_event and event.x == extents[0] and event.y == extents[2]:
+                matched = True
+
+        if not matched:
+            del self._expected[event.window.id]
+            return False
+
+        return True
+
     #
     # Checks to see if Compiz is running. It needs unique attention.
     #
@@ -494,10 +713,15 @@ class Probe:
     #
     # Reports if the window manager is running or not
     #
+    # Note: The window manager is running once it has set the root window
+    # properties that get_desktops needs.
+    #
     def is_wm_running(self):
         try:
-            PROBE.get_desktops()
-        except:
+            for name in ("_NET_NUMBER_OF_DESKTOPS", "_NET_WORKAREA", "_NET_DESKTOP_GEOMETRY"):
+                if not self.get_root().get_full_property(self.atom(name), 0):
+                    return False
+        except error.XError:
             return False
         return True
 
@@ -515,6 +739,57 @@ class Probe:
             return True
         return False
 
+    #
+    # Forgets everything we've mirrored about a window. Call this when PyTyle
+    # is done with a window (i.e., it was closed).
+    #
+    def forget_window(self, win):
+        self.forget_window_id(win.id)
+
+    #
+    # Same as forget_window, but by window id. This is also used for windows
+    # that left the client list without ever being loaded (popups, filtered
+    # windows, etc), since we may have probed them. X recycles window ids, so
+    # we don't want anything about the old window to stick to a new one.
+    #
+    def forget_window_id(self, window_id):
+        if window_id in self._mirror:
+            del self._mirror[window_id]
+        if window_id in self._expected:
+            del self._expected[window_id]
+        self._dead.discard(window_id)
+
+    #
+    # Remembers that a window is gone. Called when we get a DestroyNotify for
+    # the window. (Note that we *don't* do this for UnmapNotify- windows are
+    # unmapped when they're iconified or when we switch desktops, and they're
+    # still very much alive.)
+    #
+    # Note: We hear about *every* window that's destroyed (frames, popups,
+    # etc), but we only care about the ones PyTyle has loaded. (See
+    # _mark_dead.)
+    #
+    def mark_dead(self, win):
+        self._mark_dead(win.id)
+
+    #
+    # Reports how many events X has sent us that we haven't read yet. This
+    # never blocks.
+    #
+    def pending_events(self):
+        return self.get_display().pending_events()
+
+    #
+    # Re-reads the window's gravity. This should be called whenever X tells
+    # us that the window's WM_NORMAL_HINTS changed, so that we don't skip a
+    # request that the window actually needs. (See window_remove_static.)
+    #
+    def sync_window_hints(self, win):
+        hints = self._request_property(win, Xatom.WM_NORMAL_HINTS, Xatom.WM_SIZE_HINTS, icccm.WMNormalHints.static_size / 4)
+        static = self._collect_static(win, hints)
+        if win.id in self._mirror:
+            self._mirror[win.id]['static'] = static
+
     #
     # Ungrabs a key (and all its modifiers). This allows us to dynamically reload
     # keybindings as PyTyle is running.
@@ -525,6 +800,19 @@ class Probe:
         self.get_root().ungrab_key(keycode, mask | X.LockMask)
         self.get_root().ungrab_key(keycode, mask | X.Mod2Mask | X.LockMask)
 
+    #
+    # Waits until X sends us an event, or until "timeout" seconds have passed
+    # (None means wait forever). Anything we've been meaning to send to X is
+    # flushed first- otherwise we could be waiting for a reply to a request
+    # that never went out.
+    #
+    def wait_for_event(self, timeout = None):
+        self.get_display().flush()
+        if self.pending_events():
+            return
+
+        select.select([self.get_display()], [], [], timeout)
+
     #
     # Activates the given window. This will also pull it above all other
     # windows. Remember to flush.
@@ -532,7 +820,7 @@ class Probe:
     def window_activate(self, win):
         win.set_input_focus(X.RevertToNone, X.CurrentTime)
         self.window_stackabove(win)
-        self.get_display().flush()
+        self._flush()
 
     #
     # Attemps to remove window decorations, although I don't currently
@@ -544,11 +832,18 @@ class Probe:
     #
     # Props to devilspie for this one.
     #
+    # Note: Like all of the other _NET_WM_STATE messages, this won't be sent
+    # if we know the window already has its decorations. (See _has_state.)
+    #
     def window_add_decorations(self, win):
+        if self._has_state(win, [self.atom("_OB_WM_STATE_UNDECORATED")], False):
+            return
+
         # Doesn't seem to be working...
         #win.change_property(self.atom("_MOTIF_WM_HINTS"), self.atom("_MOTIF_WM_HINTS"), 32, [0x2, 0, 1, 0, 0])
         self._send_event(win, self.atom("_NET_WM_STATE"), [0, self.atom("_OB_WM_STATE_UNDECORATED")])
-        self.get_display().flush()
+        self._set_state(win, [self.atom("_OB_WM_STATE_UNDECORATED")], False)
+        self._flush()
 
     #
     # Simply closes the given window. This *functionality* isn't really
@@ -559,7 +854,7 @@ class Probe:
     def window_close(self, win):
         #win.destroy()
         self._send_event(win, self.atom("_NET_CLOSE_WINDOW"), [X.CurrentTime])
-        self.get_display().flush()
+        self._flush()
 
     #
     # This sets up the event mask on the given window. This will tell the
@@ -583,18 +878,27 @@ class Probe:
     # root window for this. (Or any other _NET_WM_STATE_* property.)
     #
     def window_maximize(self, win):
+        maximized = [self.atom("_NET_WM_STATE_MAXIMIZED_VERT"), self.atom("_NET_WM_STATE_MAXIMIZED_HORZ")]
+        if self._has_state(win, maximized, True):
+            return
+
         self._send_event(win, self.atom("_NET_WM_STATE"), [1, self.atom("_NET_WM_STATE_MAXIMIZED_VERT"), self.atom("_NET_WM_STATE_MAXIMIZED_HORZ")])
         #win.change_property(self.atom("_NET_WM_STATE"), Xatom.ATOM, 32, [1, self.atom("_NET_WM_STATE_MAXIMIZED_VERT"), self.atom("_NET_WM_STATE_MAXIMIZED_HORZ")])
-        self.get_display().flush()
+        self._set_state(win, maximized, True)
+        self._flush()
 
     #
     # See window_add_decorations.
     #
     def window_remove_decorations(self, win):
+        if self._has_state(win, [self.atom("_OB_WM_STATE_UNDECORATED")], True):
+            return
+
         # Doesn't seem to be working...
         #win.change_property(self.atom("_MOTIF_WM_HINTS"), self.atom("_MOTIF_WM_HINTS"), 32, [0x2, 0, 0, 0, 0])
         self._send_event(win, self.atom("_NET_WM_STATE"), [1, self.atom("_OB_WM_STATE_UNDECORATED")])
-        self.get_display().flush()
+        self._set_state(win, [self.atom("_OB_WM_STATE_UNDECORATED")], True)
+        self._flush()
 
     #
     # Attempts to set window gravity to NorthWest. So far this has been
@@ -602,26 +906,43 @@ class Probe:
     # get_window for more information on this gravity stuff as it
     # relates to PyTyle.
     #
+    # Note: If we already know the window's gravity isn't static, we don't
+    # bother.
+    #
     def window_remove_static(self, window):
+        if window.id in self._mirror and self._mirror[window.id]['static'] is False:
+            self._suppressed += 1
+            return
+
+        self._sent += 1
         window.set_wm_normal_hints(
                                    flags = Xutil.PWinGravity,
                                    win_gravity = X.NorthWestGravity
                                    )
-        self.get_display().flush()
+        if window.id in self._mirror:
+            self._mirror[window.id]['static'] = False
+        self._flush()
 
     #
     # This simply "unmaximizes" or "restores" a window. We need to do this
     # every time we resize a window because it could have been maximized
-    # by the user (which then could not be resized).
+    # by the user (which then could not be resized). Luckily, we usually
+    # know that it isn't, and can skip it.
     #
     def window_reset(self, win):
+        maximized = [self.atom("_NET_WM_STATE_MAXIMIZED_VERT"), self.atom("_NET_WM_STATE_MAXIMIZED_HORZ")]
+        if self._has_state(win, maximized, False):
+            return
+
         self._send_event(win, self.atom("_NET_WM_STATE"), [0, self.atom("_NET_WM_STATE_MAXIMIZED_VERT"), self.atom("_NET_WM_STATE_MAXIMIZED_HORZ")])
         #win.change_property(self.atom("_NET_WM_STATE"), Xatom.ATOM, 32, [0, self.atom("_NET_WM_STATE_MAXIMIZED_VERT"), self.atom("_NET_WM_STATE_MAXIMIZED_HORZ")])
-        self.get_display().flush()
+        self._set_state(win, maximized, False)
+        self._flush()
 
     #
     # Resizes the window with the given x/y/width/height pixel values.
-    # Don't forget to flush after and reset the window before.
+    # Don't forget to flush after and reset the window before. (If you're
+    # resizing more than one window, wrap them in begin/commit.)
     #
     def window_resize(self, win, x, y, width, height):
         self.window_reset(win)
@@ -634,8 +955,14 @@ class Probe:
                 x -= viewport['x']
                 y -= viewport['y']
 
+        # Remember what we asked for, and the serial number of the request
+        # that asked for it. The last serial of the flush that sends it is
+        # filled in by _flush. (See is_expected_configure.)
+        self._expected[win.id] = (width, height, x, y, self.get_display().display.request_serial, None)
+        self._unflushed.append(win.id)
+
         win.configure(x=x, y=y, width=width, height=height)
-        self.get_display().flush()
+        self._flush()
 
     #
     # Puts window at the top of the stack.
@@ -662,6 +989,327 @@ class Probe:
     # PRIVATE INSTANCE HELPER METHODS
     #------------------------------------------------------------------------------
 
+    #
+    # Flushes the display, unless we're in the middle of a transaction. (In
+    # which case commit will take care of it.)
+    #
+    # Any resizes that just went out get the serial number of the last
+    # request in this flush. That's how long we expect to hear about them.
+    # (See is_expected_configure.)
+    #
+    def _flush(self):
+        if not self._transactions:
+            self.get_display().flush()
+
+            if self._unflushed:
+                flushed = (self.get_display().display.request_serial - 1) & 0xffff
+                for window_id in self._unflushed:
+                    if window_id in self._expected and self._expected[window_id][5] is None:
+                        self._expected[window_id] = self._expected[window_id][:5] + (flushed,)
+                self._unflushed = []
+
+    #
+    # The following _request_* methods send a request to X *without* waiting
+    # for the reply. (That's what "defer" does.) The matching _collect_*
+    # methods wait for the replies and make sense of them. Splitting them up
+    # like this lets us pipeline as many requests as we like.
+    #
+    def _request_geometry(self, win):
+        return request.GetGeometry(display = self.get_display().display, defer = 1, drawable = win.id)
+
+    def _request_property(self, win, atom, ptype, length = None):
+        if length is None:
+            length = Probe.PROPERTY_LENGTH
+        return (request.GetProperty(display = self.get_display().display, defer = 1, delete = 0, window = win.id, property = atom, type = ptype, long_offset = 0, long_length = length), atom, ptype)
+
+    #
+    # We translate the root window's origin instead of the window's geometry
+    # (like wmctrl does), because we don't have the geometry yet. Translating
+    # is just an offset, so _collect_geometry can do the rest of the math.
+    #
+    def _request_translate(self, win):
+        return request.TranslateCoords(display = self.get_display().display, defer = 1, src_wid = self.get_root().id, dst_wid = win.id, src_x = 0, src_y = 0)
+
+    #
+    # Sends every request that get_window needs for the given window.
+    #
+    def _request_window(self, win):
+        return {
+                'desktop': self._request_property(win, self.atom("_NET_WM_DESKTOP"), 0),
+                'geometry': self._request_geometry(win),
+                'translate': self._request_translate(win),
+                'extents': self._request_property(win, self.atom("_NET_FRAME_EXTENTS"), 0),
+                'hints': self._request_property(win, Xatom.WM_NORMAL_HINTS, Xatom.WM_SIZE_HINTS, icccm.WMNormalHints.static_size / 4),
+                'transient': self._request_property(win, Xatom.WM_TRANSIENT_FOR, Xatom.WINDOW, 1),
+                'state': self._request_property(win, self.atom("_NET_WM_STATE"), Xatom.ATOM),
+                'type': self._request_property(win, self.atom("_NET_WM_WINDOW_TYPE"), Xatom.ATOM),
+                'class': self._request_property(win, Xatom.WM_CLASS, Xatom.STRING),
+                }
+
+    #
+    # Turns the geometry and translation replies into the window's x/y/width/
+    # height. See get_window_geometry.
+    #
+    def _collect_geometry(self, geometry, translate):
+        geometry.reply()
+        translate.reply()
+
+        x = -translate.x - geometry.x
+        y = -translate.y - geometry.y
+
+        # This is for compiz (and any other viewport-style WM?)...
+        # looks like we don't need to translate
+        if self.is_compiz():
+            viewport = self.get_viewport()
+            if viewport:
+                x = geometry.x + viewport['x']
+                y = geometry.y + viewport['y']
+
+        return {'x': x, 'y': y, 'width': geometry.width, 'height': geometry.height}
+
+    #
+    # Waits on a property request. This returns the same thing that
+    # get_full_property would. If the property is longer than what we asked
+    # for (this should be rare), then we go ahead and fetch the whole thing.
+    #
+    def _collect_property(self, win, pending):
+        prop, atom, ptype = pending
+        prop.reply()
+
+        if not prop.property_type:
+            return None
+
+        if prop.bytes_after:
+            return win.get_full_property(atom, ptype)
+
+        fmt, value = prop.value
+        prop.format = fmt
+        prop.value = value
+        return prop
+
+    #
+    # Waits on a WM_NORMAL_HINTS request, and reports whether the window has
+    # static gravity.
+    #
+    def _collect_static(self, win, pending):
+        norm_hints = self._collect_property(win, pending)
+
+        if norm_hints and norm_hints.format == 32 and len(norm_hints.value.tostring()) == icccm.WMNormalHints.static_size:
+            norm_hints = icccm.WMNormalHints.parse_binary(norm_hints.value.tostring(), self.get_display().display)[0]
+        else:
+            norm_hints = None
+
+        if norm_hints and norm_hints['win_gravity'] == X.StaticGravity:
+            return True
+        return False
+
+    #
+    # Waits on a _NET_WM_WINDOW_TYPE request, and reports whether the window
+    # is a dock/panel/menu/etc. (i.e., something we'd never tile.)
+    #
+    def _collect_dock(self, win, pending):
+        dock = self._collect_property(win, pending)
+
+        if dock and (self.atom("_NET_WM_WINDOW_TYPE_DOCK") in dock.value or self.atom("_NET_WM_WINDOW_TYPE_TOOLBAR") in dock.value or self.atom("_NET_WM_WINDOW_TYPE_MENU") in dock.value or self.atom("_NET_WM_WINDOW_TYPE_SPLASH") in dock.value or self.atom("_NET_WM_WINDOW_TYPE_DIALOG") in dock.value):
+            return True
+        return False
+
+    #
+    # Waits on all the requests sent by _request_window, and builds the window
+    # data structure out of them.
+    #
+    def _collect_window(self, win, requests):
+        # Note: We don't fetch the window name here. We don't really need it,
+        # so it's only fetched if someone asks for it. (See get_window_title.)
+
+        # Fetch the desktop that the window is on. We need this.
+        #
+        # *However* - This could change in the future if we want to support
+        # viewports instead of desktops (*ahem* compiz *ahem*). We might need
+        # to calculate the "desktop" based on the window's x,y coordinates
+        # in the future. (Like we do for screens.)
+        windesk = self._collect_property(win, requests['desktop'])
+        if not windesk:
+            return None
+        windesk = windesk.value[0]
+
+        # Fetch the window geometry- see get_window_geometry for more info.
+        wingeom = self._collect_geometry(requests['geometry'], requests['translate'])
+
+        # Extents are *hopefully* the window decoration sizes. PyTyle will
+        # take these into account when sizing the windows. So far, support
+        # seems pretty good for this from WM's.
+        extents = self._collect_property(win, requests['extents'])
+
+        if not extents:
+            extents = [0, 0, 0, 0]
+        else:
+            extents = extents.value
+
+        # We use the normal hints to find the window's gravity. If the
+        # gravity is static, then we need to change it to NorthWest at
+        # some point if we expect the window to behave like we want it to.
+        #
+        # Note: This is obviously a hack. It would be better if we could
+        # *account* for static gravity. Especially since static gravity
+        # is set by the application itself, and if we don't let it have what
+        # it wants, we might get unexpected behavior. So far so good, though.
+        # If anyone has a better understanding of gravity than I do (that is,
+        # beyond the usual man page), then I'd love to talk to you.
+        static = self._collect_static(win, requests['hints'])
+
+        # So the transient will tell us a window's parent window. Why do we
+        # care? Because if a top level window creates a child window (i.e.
+        # a popup), then it will hopefully set that child window's transient
+        # property as itself. If we come across transient windows, I don't
+        # think we want to tile them. Sometimes the transient is set to the
+        # root window, in which case it is obviously a window we want to tile.
+        transient = self._collect_property(win, requests['transient'])
+
+        if not transient or transient.format != 32 or len(transient.value) < 1 or transient.value[0] == self.get_root().id:
+            popup = False
+        else:
+            popup = True
+
+        # If a window is hidden, we don't want to tile it. (Or more importantly,
+        # we don't want PyTyle to *think* there is a window that's there and
+        # isn't.) Check for dock/panel/skip taskbar, etc...
+        #
+        # Note: We check both the "_NET_WM_STATE" (different from "WM_STATE" which
+        # tells us about iconification and stuff) and the "_NET_WM_WINDOW_TYPE".
+        state = self._collect_property(win, requests['state'])
+        dock = self._collect_dock(win, requests['type'])
+        hidden = self._is_hidden(state, dock)
+
+        # Since we have it anyway, remember the window's state and gravity.
+        # And if we thought it was dead, it clearly isn't. (Its id was
+        # recycled.)
+        self._mirror_window(win, state, static, extents, dock)
+        self._dead.discard(win.id)
+
+        # The window class is stored as "instance\0class\0".
+        winclass = self._collect_property(win, requests['class'])
+
+        if winclass and winclass.format == 8 and len(winclass.value.split('\0')) >= 2:
+            winclass = self._intern_class(winclass.value.split('\0')[:2])
+        else:
+            winclass = None
+
+        # Construct the window data structure. This is passed to the
+        # update_attributes method.
+        return {
+                 'id': win.id,
+                 'desktop': int(windesk),
+                 'x': wingeom['x'], 'y': wingeom['y'],
+                 'width': wingeom['width'], 'height': wingeom['height'],
+                 'd_left': extents[0], 'd_right': extents[1],
+                 'd_top': extents[2], 'd_bottom': extents[3],
+                 'class': winclass,
+                 'static': static,
+                 'popup': popup,
+                 'hidden': hidden,
+                 'xobj': win
+                 }
+
+    #
+    # Our X error handler. Errors from requests without replies (configure,
+    # send_event, etc) end up here instead of being raised. If X tells us a
+    # window doesn't exist, then we remember that it's dead. Anything else
+    # gets printed like python-xlib would have done.
+    #
+    def _handle_error(self, err, request):
+        if isinstance(err, error.BadWindow) or isinstance(err, error.BadDrawable):
+            self._mark_dead(err.resource_id)
+        else:
+            print >> sys.stderr, err
+
+    #
+    # Remembers that the window with the given id is dead- but only if it's a
+    # window PyTyle has loaded. Otherwise, the set of dead windows would grow
+    # forever (and since X recycles window ids, a new window could be born
+    # dead). Windows are forgotten when they're deleted (see forget_window).
+    #
+    def _mark_dead(self, window_id):
+        # State imports the Probe, so we can't import it at the top.
+        from PyTyle.State import State
+
+        if window_id in State.get_windows():
+            self._dead.add(window_id)
+
+    #
+    # Lots of windows share the same class (think of how many terminals you
+    # have open), so every window with the same class shares the same tuple.
+    #
+    def _intern_class(self, winclass):
+        winclass = (intern(winclass[0]), intern(winclass[1]))
+        if winclass not in self._classes:
+            self._classes[winclass] = winclass
+        return self._classes[winclass]
+
+    #
+    # Given a window's _NET_WM_STATE and whether it's a dock, reports whether
+    # the window should be considered hidden.
+    #
+    def _is_hidden(self, state, dock):
+        if state and (self.atom("_NET_WM_STATE_HIDDEN") in state.value or self.atom("_NET_WM_STATE_SKIP_TASKBAR") in state.value or self.atom("_NET_WM_STATE_SKIP_PAGER") in state.value):
+            return True
+        return dock
+
+    #
+    # The state mirror. Every message we send to the window manager makes it do
+    # some work and send a flurry of events back our way- so if a window is
+    # already in the state we're asking for, we'd rather not send anything at
+    # all. To know that, we keep a copy of each window's _NET_WM_STATE atoms
+    # and whether its gravity is static. It's filled in whenever we probe a
+    # window, updated whenever we change something, and re-read whenever X
+    # says the window changed (see get_window_hidden and sync_window_hints).
+    #
+    # If we don't know anything about a window, we always send.
+    #
+    # We also hang on to the decoration sizes (see is_expected_configure) and
+    # whether the window is a dock (see get_window_hidden), since neither of
+    # those change very often.
+    #
+    def _mirror_window(self, win, state, static, extents, dock):
+        self._mirror[win.id] = {
+                                'state': set(state.value) if state else set(),
+                                'static': static,
+                                'extents': list(extents),
+                                'dock': dock
+                                }
+
+    #
+    # Reports whether every one of the given _NET_WM_STATE atoms is present (or
+    # absent, if present is False) on the given window. If so, we're about to
+    # send a request that won't do anything, so it's counted as suppressed.
+    # Otherwise it's counted as sent.
+    #
+    def _has_state(self, win, atoms, present):
+        if win.id in self._mirror:
+            state = self._mirror[win.id]['state']
+            for atom in atoms:
+                if (atom in state) != present:
+                    break
+            else:
+                self._suppressed += 1
+                return True
+
+        self._sent += 1
+        return False
+
+    #
+    # Updates the mirror after we've sent a _NET_WM_STATE change.
+    #
+    def _set_state(self, win, atoms, present):
+        if win.id not in self._mirror:
+            return
+
+        for atom in atoms:
+            if present:
+                self._mirror[win.id]['state'].add(atom)
+            else:
+                self._mirror[win.id]['state'].discard(atom)
+
     #
     # Another tricky one to figure out- this will allow you to send
     # a client message to the root window (necessary for removing
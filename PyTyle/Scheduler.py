@@ -0,0 +1,104 @@
+#===============================================================================
+# PyTyle - A manual tiling manager
+# Copyright (C) 2009  Andrew Gallant <andrew@pytyle.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#===============================================================================
+
+"""
+Scheduler.py
+
+Keeps track of things that need to happen a little bit later. The main event
+loop used to sleep whenever it needed to give the window manager a chance to
+settle down (after a desktop switch, a new window, etc). While it was sleeping,
+it wasn't reading key presses. Now those delays are named timers, and the main
+loop waits on X *or* the next timer, whichever comes first.
+
+Timers are named so that a burst of the same event only schedules one timer.
+"""
+
+import time
+
+class Scheduler:
+    #------------------------------------------------------------------------------
+    # CLASS VARIABLES
+    #------------------------------------------------------------------------------
+
+    #
+    # Maps a timer name to a tuple of (time it's due, callback).
+    #
+    _TIMERS = {}
+
+
+    #------------------------------------------------------------------------------
+    # STATIC METHODS
+    #------------------------------------------------------------------------------
+
+    #
+    # Cancels the given timer, if it's pending.
+    #
+    @staticmethod
+    def cancel(name):
+        if name in Scheduler._TIMERS:
+            del Scheduler._TIMERS[name]
+
+    #
+    # Reports how long (in seconds) until the next timer is due. If there are
+    # no timers, then this returns None. (Which, conveniently, is what select
+    # takes to mean "wait forever".)
+    #
+    @staticmethod
+    def get_timeout():
+        if not Scheduler._TIMERS:
+            return None
+
+        due = min([when for when, callback in Scheduler._TIMERS.values()])
+        return max(0, due - time.time())
+
+    #
+    # Reports whether the given timer is pending.
+    #
+    @staticmethod
+    def is_pending(name):
+        return name in Scheduler._TIMERS
+
+    #
+    # Runs every timer that's due, in the order they were due. Timers are
+    # removed *before* they're run, so a callback is free to schedule itself
+    # again.
+    #
+    @staticmethod
+    def run_due():
+        now = time.time()
+        due = [(when, name) for name, (when, callback) in Scheduler._TIMERS.items() if when <= now]
+
+        for when, name in sorted(due):
+            if name not in Scheduler._TIMERS:
+                continue
+
+            callback = Scheduler._TIMERS[name][1]
+            del Scheduler._TIMERS[name]
+            callback()
+
+    #
+    # Schedules the callback to run in "delay" seconds. If a timer with the
+    # same name is already pending, then this does nothing- we're already
+    # going to get to it.
+    #
+    @staticmethod
+    def schedule(name, delay, callback):
+        if name in Scheduler._TIMERS:
+            return
+        Scheduler._TIMERS[name] = (time.time() + delay, callback)
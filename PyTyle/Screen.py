@@ -26,13 +26,25 @@ will keep track of its state; like if it needs to be tiled, has tiling
 enabled/disable, and of course, its current tiling algorithm.
 """
 
+import weakref
+
 from PyTyle.Config import Config
 from PyTyle.State import State
 from PyTyle.Debug import DEBUG
 
 from PyTyle.Window import *
 
-class Screen:
+class Screen(object):
+    #
+    # There's a screen for every desktop, viewport and monitor, so keep them
+    # small. (See the note in Window.) Like windows, a screen only weakly
+    # references its viewport. (See viewport below.)
+    #
+    __slots__ = (
+                 'id', 'x', 'y', 'width', 'height', '_viewport', 'windows',
+                 '_active', '_tile', '_tiled', '_tiling', '__weakref__'
+                 )
+
     #------------------------------------------------------------------------------
     # CONSTRCUTOR AND SCREEN RELATED ATTRIBUTES/METHODS
     #------------------------------------------------------------------------------
@@ -89,16 +101,21 @@ class Screen:
     #    4. Finally, if it's none of the above, then return the currently
     #       set active window.
     #
+    # Note: The active window is only weakly referenced (see set_active), so
+    # if it's been thrown away, it's as if there's no active window.
+    #
     def get_active(self):
+        active = self._active() if self._active else None
         wins = self.get_tiler().storage.get_all()
-        if not self._active and not wins:
-            self._active = None
-        elif wins and (not self._active or self._active.hidden or self._active.screen.id != self.id or not self._active.lives()):
-            self._active = wins[0]
-        elif not wins and self._active.screen.id != self.id:
-            self._active = None
+        if not active and not wins:
+            active = None
+        elif wins and (not active or active.hidden or active.screen.id != self.id or not active.lives()):
+            active = wins[0]
+        elif not wins and active.screen.id != self.id:
+            active = None
 
-        return self._active
+        self.set_active(active)
+        return active
 
     #
     # Fetches the current tiling algorithm. The tiling algorithm *must* be
@@ -119,15 +136,20 @@ class Screen:
     # the windows. If you have some fancy setup in your workarea, this is the
     # place to tinker! (If the configuration file isn't enough power.)
     #
+    # Note 2: The manual overrides are read from the config snapshot (see
+    # Config.SNAPSHOT), which already has the defaults filled in.
+    #
     def get_workarea(self):
+        workarea = Config.SNAPSHOT.workarea
+
         # If we have one screen, look for a "Screen 0" config
         # and use it if it exists...
         if len(self.viewport.screens) == 1:
-            if 0 in Config.WORKAREA:
-                x = self.x + Config.workarea(0, 'left')
-                y = self.y + Config.workarea(0, 'top')
-                height = self.height - Config.workarea(0, 'bottom') + Config.workarea(0, 'top')
-                width = self.width - Config.workarea(0, 'right') + Config.workarea(0, 'left')
+            if 0 in workarea:
+                x = self.x + workarea[0].left
+                y = self.y + workarea[0].top
+                height = self.height - workarea[0].bottom + workarea[0].top
+                width = self.width - workarea[0].right + workarea[0].left
             else:
                 if PROBE.is_compiz():
                     x = self.viewport.x
@@ -146,10 +168,11 @@ class Screen:
             width = self.width
 
             # Factor in manual docks...
-            x += Config.workarea(self.id, 'left')
-            y += Config.workarea(self.id, 'top')
-            height -= Config.workarea(self.id, 'bottom') + Config.workarea(self.id, 'top')
-            width -= Config.workarea(self.id, 'right') + Config.workarea(self.id, 'left')
+            docks = workarea.get(self.id, Config.SNAPSHOT.default_workarea)
+            x += docks.left
+            y += docks.top
+            height -= docks.bottom + docks.top
+            width -= docks.right + docks.left
 
         return (x, y, width, height)
 
@@ -192,10 +215,12 @@ class Screen:
         State.queue_screen(self)
 
     #
-    # Simply sets the active window. No questions asked.
+    # Simply sets the active window. No questions asked. We only keep a weak
+    # reference, so that a closed window isn't kept alive just because it
+    # was the last active window on some screen.
     #
     def set_active(self, window):
-        self._active = window
+        self._active = weakref.ref(window) if window else None
 
     #
     # Sets the tiler of this screen. A tiler *must* be a subclass of Tile.
@@ -212,7 +237,7 @@ class Screen:
     # needs to be re-tiled.
     #
     def add_window(self, window):
-        State.add_window(window)
+        State.add_window(window, self)
         self.windows[window.id] = window
         self.needs_tiling()
 
@@ -255,6 +280,17 @@ class Screen:
 
         return False
 
+    #
+    # The viewport that the screen is on, or None if that viewport is gone.
+    #
+    def _get_viewport(self):
+        return self._viewport() if self._viewport else None
+
+    def _set_viewport(self, viewport):
+        self._viewport = weakref.ref(viewport) if viewport else None
+
+    viewport = property(_get_viewport, _set_viewport)
+
     #
     # Updates screen with attributes fetched from X. This is actually everything
     # that the xinerama extension gives us. I'm not sure if screen ids remain
@@ -0,0 +1,108 @@
+#===============================================================================
+# PyTyle - A manual tiling manager
+# Copyright (C) 2009  Andrew Gallant <andrew@pytyle.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#===============================================================================
+
+"""
+ScreenIndex.py
+
+Answers "which of these rectangles is the point (x, y) in?" without looking at
+every rectangle. Each desktop keeps one of these for its viewports, and each
+viewport keeps one for its screens. (See Desktop.find_screen.) With compiz, a
+desktop can have a big grid of viewports, times however many monitors there
+are- and we ask this question every time a window moves.
+
+The rectangles are cut into vertical slabs at every left and right edge. Each
+slab knows which rectangles cover it, from top to bottom. So finding a point
+is two binary searches: one for the slab, and one within the slab.
+
+Anything with x, y, width and height attributes can be indexed. The index is
+*not* updated when the rectangles change- build a new one.
+"""
+
+import bisect
+
+class ScreenIndex(object):
+    __slots__ = ('_edges', '_slabs', '_origin')
+
+    #------------------------------------------------------------------------------
+    # CONSTRUCTOR AND INSTANCE METHODS
+    #------------------------------------------------------------------------------
+
+    #
+    # Builds the index from a list of rectangles. If rectangles overlap (i.e.,
+    # cloned monitors), the one that comes first in the list wins.
+    #
+    def __init__(self, rects):
+        self._origin = None
+        for rect in rects:
+            if rect.x == 0 and rect.y == 0:
+                self._origin = rect
+                break
+
+        edges = set()
+        for rect in rects:
+            edges.add(rect.x)
+            edges.add(rect.x + rect.width)
+        self._edges = sorted(edges)
+
+        # Slab i is everything from _edges[i] up to (but not including)
+        # _edges[i + 1]. Each slab is a tuple of (tops, bottoms, rectangles),
+        # sorted from top to bottom, with no overlaps.
+        self._slabs = []
+        for i in range(len(self._edges) - 1):
+            left, right = self._edges[i], self._edges[i + 1]
+            covering = [rect for rect in rects if rect.x <= left and rect.x + rect.width >= right]
+
+            # Overlapping? Earlier rectangles win, so each one only keeps the
+            # parts that aren't covered yet. (That could be more than one
+            # piece, if it sticks out both above and below.)
+            pieces = []
+            for rect in covering:
+                spans = [(rect.y, rect.y + rect.height)]
+                for top, bottom, other in pieces:
+                    spans = [(a, b) for (start, end) in spans for (a, b) in ((start, min(end, top)), (max(start, bottom), end)) if a < b]
+                pieces.extend([(top, bottom, rect) for (top, bottom) in spans])
+
+            # No two pieces start at the same place, so this never has to
+            # compare the rectangles themselves.
+            pieces.sort()
+
+            tops = [top for (top, bottom, rect) in pieces]
+            bottoms = [bottom for (top, bottom, rect) in pieces]
+            found = [rect for (top, bottom, rect) in pieces]
+
+            self._slabs.append((tops, bottoms, found))
+
+    #
+    # Finds the rectangle that contains (x, y). If there isn't one, and the
+    # point is off the top or left of the screen (negative), then it belongs
+    # to whatever is at 0, 0. (Same as Screen.is_on_screen and
+    # Viewport.is_on_viewport.) Otherwise, returns None.
+    #
+    def find(self, x, y):
+        i = bisect.bisect_right(self._edges, x) - 1
+        if 0 <= i < len(self._slabs):
+            tops, bottoms, found = self._slabs[i]
+            j = bisect.bisect_right(tops, y) - 1
+            if j >= 0 and y < bottoms[j]:
+                return found[j]
+
+        if x < 0 or y < 0:
+            return self._origin
+
+        return None
@@ -34,6 +34,8 @@ was hidden), a screen will be queued up.
 State also serves to initialize hot keys and scans for new windows.
 """
 
+import sys, collections
+
 from PyTyle.Config import Config
 from PyTyle.Probe import PROBE
 
@@ -42,10 +44,23 @@ class State:
     # CLASS VARIABLES
     #------------------------------------------------------------------------------ 
     
+    #
+    # The window ids in the window manager's client list that we've dealt
+    # with- either loaded, or decided not to load. (See update_client_list.)
+    #
+    _CLIENT_LIST = set()
+
     #
     # Keeps track of the currently active desktop.
     #
     _DESKTOP = None
+
+    #
+    # The number of the desktop that the window manager says is current, as
+    # of the last time we asked. None means we have to ask again. (See
+    # reload_active and invalidate_current_desktop.)
+    #
+    _CURRENT_DESKTOP = None
     
     #
     # Keeps a record of all instantiated desktops.
@@ -53,7 +68,14 @@ class State:
     _DESKTOPS = {}
     
     #
-    # Keeps a mapping of keys to tiling actions
+    # Maps remote command payloads (see pytyle-client) to tiling actions.
+    #
+    _CALLBACKS = {}
+
+    #
+    # Keeps a mapping of keys to tiling actions. Each key is a tuple of
+    # (keycode, modifier mask), and each action is a tuple of (callable,
+    # whether it can enable tiling). See Tile.compile_action.
     #
     _DISPATCHER = {}
     
@@ -61,12 +83,31 @@ class State:
     # Tells us whether we need to reload the config file.
     #
     _RELOAD = False
+
+    #
+    # Maps the id of every window in a screen to that screen. (And the screen
+    # knows its viewport and desktop.) Screen.add_window and
+    # Screen.delete_window keep this up to date. (See reload_active.)
+    #
+    _SCREENS = {}
     
     #
     # Queue of screens to tile. It's flushed at the start of each event loop
     # iteration.
     #
-    _TO_TILE = []
+    # Note: A screen is usually told it needs tiling several times in a row
+    # (a new window queues it twice, a moved window queues both of its
+    # screens every time it moves...), so this is really an ordered set. A
+    # screen that's already queued stays where it is.
+    #
+    _TO_TILE = collections.OrderedDict()
+
+    #
+    # How many times a screen was queued, and how many of those were for a
+    # screen that was already queued. (See reset_queue_stats.)
+    #
+    _QUEUED = 0
+    _ABSORBED = 0
     
     #
     # Keeps a record of all instantiated windows.
@@ -90,11 +131,12 @@ class State:
         State._DESKTOPS[desktop.id] = desktop
         
     #
-    # Adds a window to the state.
+    # Adds a window to the state, on the given screen.
     #
     @staticmethod
-    def add_window(window):
+    def add_window(window, screen):
         State._WINDOWS[window.id] = window
+        State._SCREENS[window.id] = screen
         
     #
     # Removes a window from the state.
@@ -102,6 +144,7 @@ class State:
     @staticmethod
     def delete_window(window):
         del State._WINDOWS[window.id]
+        del State._SCREENS[window.id]
         
     #
     # Removes a screen from queue. Only used when flushing the queue
@@ -109,7 +152,7 @@ class State:
     #
     @staticmethod
     def dequeue_screen():
-        return State._TO_TILE.pop(0)
+        return State._TO_TILE.popitem(last = False)[0]
     
     #
     # Unsets the flag to reload the config file.
@@ -139,6 +182,16 @@ class State:
     def get_desktops():
         return State._DESKTOPS
     
+    #
+    # Retrieves the tiling action for a remote command payload, or None if
+    # there isn't one.
+    #
+    @staticmethod
+    def get_callback(payload):
+        if payload in State._CALLBACKS:
+            return State._CALLBACKS[payload][0]
+        return None
+
     #
     # Retrieves the dispatcher.
     #
@@ -146,6 +199,14 @@ class State:
     def get_dispatcher():
         return State._DISPATCHER
     
+    #
+    # Retrieves the screen that the window with the given id is on, or None
+    # if we don't know about the window.
+    #
+    @staticmethod
+    def get_window_screen(window_id):
+        return State._SCREENS.get(window_id)
+
     #
     # Retrieves the windows in the state.
     #
@@ -181,18 +242,42 @@ class State:
     #
     @staticmethod
     def queue_screen(screen):
-        State._TO_TILE.append(screen)
+        State._QUEUED += 1
+        if screen in State._TO_TILE:
+            State._ABSORBED += 1
+            return
+        State._TO_TILE[screen] = True
         
     #
     # Simply ties a key code to a callback method in the Tile class. Valid key codes
     # can be found in the documentation provided. (But are based on the key symbols
     # defined in Xlib. Probably in Xlib/keysymdef/latin1.py and Xlib/keysymdef/miscellany.py)
+    #
+    # Note: The callback is a compiled action (see Tile.compile_action), not a name.
     # 
     @staticmethod
     def register_hotkey(keycode, mask, callback):
-        if not keycode in State._DISPATCHER:
-            State._DISPATCHER[keycode] = {}
-        State._DISPATCHER[keycode][mask] = callback
+        State._DISPATCHER[(keycode, mask)] = callback
+
+    #
+    # Compiles the remote command callbacks from the configuration file (and the
+    # defaults). Like the key bindings, a callback that doesn't name a real action
+    # is reported now and skipped.
+    #
+    @staticmethod
+    def register_callbacks():
+        from PyTyle.Tile import Tile
+
+        callbacks = dict(Config.DEFAULTS['CALLBACKS'])
+        callbacks.update(Config.CALLBACKS)
+
+        State._CALLBACKS = {}
+        for payload, name in callbacks.items():
+            action = Tile.compile_action(name)
+            if not action:
+                print >> sys.stderr, "Unknown action %s for remote command %s" % (name, payload)
+                continue
+            State._CALLBACKS[payload] = action
         
     #
     # Registers all the key bindings specified in the configuration file. Currently,
@@ -202,6 +287,9 @@ class State:
     #
     @staticmethod
     def register_hotkeys():
+        # Tile imports State, so we can't import it at the top.
+        from PyTyle.Tile import Tile
+
         for mapping in Config.KEYMAP:
             callback = Config.KEYMAP[mapping]
             
@@ -213,6 +301,13 @@ class State:
             if not key:
                 print >> sys.stderr, "Could not map %s to %s" % (mapping, callback) 
                 continue
+
+            # No such action? Better to hear about it now than every time
+            # the key is pressed.
+            action = Tile.compile_action(callback)
+            if not action:
+                print >> sys.stderr, "Could not map %s to unknown action %s" % (mapping, callback)
+                continue
             
             # generate key code and mod mask...
             keycode = PROBE.generate_keycode(key)
@@ -225,12 +320,18 @@ class State:
                 print "Nada:", callback
             
             # Finally register the key with the dispatcher...            
-            State.register_hotkey(keycode, modmask, callback)
+            State.register_hotkey(keycode, modmask, action)
         
     #
     # Simply probes for the currently active window, and updates the currently
     # active desktop, screen, and window accordingly.
     #
+    # Note: If we know about the active window, then we know its screen (see
+    # _SCREENS), and its screen knows its viewport. So we don't have to search
+    # every viewport and screen for it. The window's screen is only used if
+    # it's on the current desktop, which we only ask X for when we don't
+    # already know it. (See _CURRENT_DESKTOP.)
+    #
     @staticmethod
     def reload_active(active = None, force = False):
         if not active: 
@@ -244,7 +345,16 @@ class State:
             if current and current.id == activeid:
                 return
             
-        State._DESKTOP = State.get_desktops()[PROBE.get_desktop()]        
+        if State._CURRENT_DESKTOP is None:
+            State._CURRENT_DESKTOP = PROBE.get_desktop()
+        State._DESKTOP = State.get_desktops()[State._CURRENT_DESKTOP]
+
+        screen = State.get_window_screen(activeid) if activeid else None
+        if screen and screen.viewport.desktop is State._DESKTOP:
+            State._DESKTOP._VIEWPORT = screen.viewport
+            State._DESKTOP._VIEWPORT._SCREEN = screen
+            screen.set_active(screen.windows[activeid])
+            return
                 
         if not activeid:
             if not State._DESKTOP._VIEWPORT:
@@ -252,44 +362,37 @@ class State:
                 
             if not State._DESKTOP._VIEWPORT._SCREEN:
                 State._DESKTOP._VIEWPORT._SCREEN = State._DESKTOP._VIEWPORT.screens[0]
-        else:
-            for viewport in State._DESKTOP.viewports.values():
-                for screen in viewport.screens.values():
-                    if activeid in screen.windows:
-                        State._DESKTOP._VIEWPORT = viewport
-                        State._DESKTOP._VIEWPORT._SCREEN = screen
-                        State._DESKTOP._VIEWPORT._SCREEN.set_active(screen.windows[activeid])
-                        break
             
     #
-    # Similar to scan_new_windows, except it returns all windows reported by
-    # the window manager. We used this when we get a DestroyNotify event: iterate
-    # over the State windows and see which ones aren't in this list and delete
-    # them.
+    # Reads the window manager's client list, and compares it with the ids
+    # we've dealt with so far. Returns a tuple of (new window ids, removed
+    # window ids). The new ones are in the same order as the client list.
+    #
+    # Note: This is compared against the *client list*, not against the
+    # windows in the State. That way, windows that we decided not to load
+    # (popups, filtered windows, etc) aren't probed over and over. New ids
+    # aren't remembered here, though- whoever loads them has to call
+    # add_client. If a window couldn't be probed yet (say, the WM hasn't
+    # given it a desktop), it'll show up as new again next time.
     #
     @staticmethod
-    def scan_all_windows():
-        ret = []
+    def update_client_list():
         windows = PROBE.get_window_list()
-        for window in windows:
-            ret.append(window) 
-                
-        return ret
-    
+        current = set(windows)
+
+        added = [window for window in windows if window not in State._CLIENT_LIST]
+        removed = State._CLIENT_LIST - current
+
+        State._CLIENT_LIST -= removed
+        return (added, removed)
+
     #
-    # There are problems with using the window given via the CreateNotify event
-    # type, and thus, PyTyle currently listens for that event and scans for new
-    # windows manually.
+    # Remembers that we've dealt with the given window id from the client
+    # list. (See update_client_list.)
     #
     @staticmethod
-    def scan_new_windows():
-        ret = []
-        windows = PROBE.get_window_list()
-        for window in windows:
-            if hex(window) not in State.get_windows():
-                ret.append(window) 
-                
-        return ret
+    def add_client(window_id):
+        State._CLIENT_LIST.add(window_id)
     
     #
     # UN-registers all the key bindings specified in the configuration file. This
@@ -322,12 +425,35 @@ class State:
         # And finally reset the dispatcher...
         State._DISPATCHER = {}
     
+    #
+    # Returns how many times screens were queued for tiling, and how many of
+    # those were duplicates, since the last time this was called. Then starts
+    # counting again.
+    #
+    @staticmethod
+    def reset_queue_stats():
+        stats = (State._QUEUED, State._ABSORBED)
+        State._QUEUED = 0
+        State._ABSORBED = 0
+        return stats
+
+    #
+    # Forgets which desktop is current, so the next reload_active asks X.
+    # Call this whenever the window manager switches desktops.
+    #
+    @staticmethod
+    def invalidate_current_desktop():
+        State._CURRENT_DESKTOP = None
+
     #
     # Wipes the current state. Useful for when the screen orientation changes.
     #
     @staticmethod
     def wipe():
         State._DESKTOP = None
+        State._CURRENT_DESKTOP = None
         State._WINDOWS = {}
+        State._SCREENS = {}
+        State._CLIENT_LIST = set()
         State._DESKTOPS = {}
-        State._TO_TILE = []
\ No newline at end of file
+        State._TO_TILE = collections.OrderedDict()
\ No newline at end of file
@@ -27,21 +27,28 @@ configuration) aren't really relevant to the physical display of the windows.
 wish.)
 
 In fact, to create your own customized tiling algorithm, you need only overload
-the following methods: _tile, _cycle, _master_increase, _master_decrease,
+the following methods: _layout, _cycle, _master_increase, _master_decrease,
 help_find_next, and help_find_previous. By default, Vertical and Horizontal are
 so similar, that currently, _cycle, help_find_next, and help_find_previous are
 overloaded once in TileDefault (which cannot be used as a tiling algorithm by
-itself), and _tile, _master_increase, and _master_decrease are each overloaded
+itself), and _layout, _master_increase, and _master_decrease are each overloaded
 accordingly in two of TileDefault's subclasses: Horizontal and Vertical.
 
+A layout (see _layout) is just geometry: given a workarea, how many masters
+and slaves there are, and a few options from the tiler's state, it says where
+each window goes. It never touches a window. Tile then puts the windows there
+(see help_apply). This means layouts can be worked out (and played with)
+without X.
+
 To create your own tiling algorithm, read the comments in this file, along with
 Tilers/TileDefault.py, Tilers/Horizontal.py, and Tilers/Vertical.py.
 """
 
-import sys, os, time
+import sys, os, time, collections
 
 from PyTyle.Config import Config
 from PyTyle.State import State
+from PyTyle.Probe import PROBE
 from PyTyle.Debug import DEBUG
 import traceback
 
@@ -49,10 +56,95 @@ from PyTyle.TileStorage import TileStorage
 from PyTyle.TileState import TileState
 
 class Tile:
+    #------------------------------------------------------------------------------
+    # CLASS VARIABLES
+    #------------------------------------------------------------------------------
+
+    #
+    # The names of the tiler state items (see TileState) that this tiler's layout
+    # uses. These are the only state items that _layout gets to see. (See
+    # help_layout_options.)
+    #
+    LAYOUT_OPTIONS = ()
+
+    #
+    # The actions that can be bound to keys (or remote commands) in the
+    # configuration file, besides "tile.<layout>". (See compile_action and the
+    # dispatcher methods at the bottom of this class.) Nothing else in Tile
+    # is an action- so a typo, or something like "help_resize", is turned
+    # away when the configuration is loaded.
+    #
+    ACTIONS = frozenset([
+                         'tile', 'untile', 'cycle_tiler', 'reload', 'reset', 'cycle',
+                         'screen0_focus', 'screen1_focus', 'screen2_focus',
+                         'screen0_put', 'screen1_put', 'screen2_put',
+                         'master_increase', 'master_decrease', 'add_master', 'remove_master',
+                         'make_active_master', 'win_master', 'win_close',
+                         'win_previous', 'win_next', 'switch_previous', 'switch_next',
+                         'max_all', 'restore_all', 'query'
+                         ])
+
+    #
+    # How many windows the current tiling pass has resized, and how many it
+    # skipped because they were already where they belong. (See help_resize.)
+    #
+    _RESIZED = 0
+    _SKIPPED = 0
+
+    #
+    # Layouts we've already worked out (see help_layout), least recently used
+    # first. They're shared by every screen on every desktop- a layout only
+    # depends on its arguments, so two screens of the same size with the same
+    # number of windows get the exact same thing.
+    #
+    # Note: This is bounded by _LAYOUTS_MAX. When it's full, the least recently
+    # used layout is thrown away.
+    #
+    _LAYOUTS = collections.OrderedDict()
+    _LAYOUTS_MAX = 128
+
+    #
+    # How many times a layout was found in _LAYOUTS, and how many times it had
+    # to be worked out. (See reset_layout_stats.)
+    #
+    _LAYOUT_HITS = 0
+    _LAYOUT_MISSES = 0
+
+
     #------------------------------------------------------------------------------
     # STATIC METHODS (DISPATCHER RELATED)
     #------------------------------------------------------------------------------
 
+    #
+    # Turns the name of an action (from the configuration file) into something
+    # we can call with a tiler. Returns a tuple of the callable, and whether
+    # the action can enable tiling (only the "tile.*" actions can). If there
+    # is no such action (see ACTIONS), this returns None.
+    #
+    # This is done once, when the key bindings are loaded- so a typo in the
+    # configuration file is caught right away, instead of on every key press.
+    #
+    @staticmethod
+    def compile_action(name):
+        if name.startswith('tile.'):
+            layout = name[len('tile.'):]
+            if layout != 'default' and layout not in Config.TILERS:
+                return None
+
+            def action(tiler):
+                if layout != 'default':
+                    tiler.screen.set_tiler(Config.tilers(layout))
+                    tiler = tiler.screen.get_tiler()
+                    tiler._reset()
+                Tile.tile(tiler)
+
+            return (action, True)
+
+        if name not in Tile.ACTIONS:
+            return None
+
+        return (getattr(Tile, name), False)
+
     #
     # Initiate the dispatching routing.
     #
@@ -70,40 +162,40 @@ class Tile:
     # enabled and we aren't calling tile. (Essentially, pressing the tile key
     # binding is the only way to enable tiling.)
     #
+    # Note: Actions are callables (see compile_action), not names. The key
+    # bindings were compiled when they were loaded (see State.register_hotkeys),
+    # so all we do here is look one up.
+    #
     @staticmethod
     def dispatch(tiler, action=None, keycode=None, masks=None):
         if not action and keycode and masks:
-            if keycode not in State.get_dispatcher():
-                print >> sys.stderr, "Keycode %s is not bound" % keycode
-                return
-
-            # Now we need to determine which masks were used...
-            if masks in State.get_dispatcher()[keycode]:
-                action = State.get_dispatcher()[keycode][masks]
-            else:
+            if (keycode, masks) not in State.get_dispatcher():
                 print >> sys.stderr, "Keycode %s and keymask %d are not bound" % (keycode, masks)
                 return
 
-            if not tiler.screen.is_tiling() and action.find('tile.') == -1:
+            action, enables_tiling = State.get_dispatcher()[(keycode, masks)]
+
+            if not tiler.screen.is_tiling() and not enables_tiling:
                 return
         elif action:
             # We can only initiate tiling through keycodes...
             if not tiler.screen.is_tiling():
                 return
 
-        # Turn the action into a method...
-        if action.find('tile.') != -1:
-            layout = action[(action.find('.') + 1):]
-            if layout != 'default' and layout in Config.TILERS:
-                tiler.screen.set_tiler(Config.tilers(layout))
-                tiler = tiler.screen.get_tiler()
-                tiler._reset()
-            action = Tile.tile
-        else:
-            action = eval('Tile.' + action)
-
         action(tiler)
 
+    #
+    # Returns how many layouts were found in the cache and how many had to be
+    # worked out, since the last time this was called. Then starts counting
+    # again. (See help_layout.)
+    #
+    @staticmethod
+    def reset_layout_stats():
+        stats = (Tile._LAYOUT_HITS, Tile._LAYOUT_MISSES)
+        Tile._LAYOUT_HITS = 0
+        Tile._LAYOUT_MISSES = 0
+        return stats
+
 
     #------------------------------------------------------------------------------
     # CONSTRUCTOR AND GENERIC TILING METHODS
@@ -116,7 +208,7 @@ class Tile:
     # Also, in general, the following tiling methods are fairly generic (any method beginning
     # with an underscore). However, the class hierarchy is setup in such a way that does not
     # preclude their customization. Simply overload whichever method that needs customizing
-    # in your tiling class. (_tile, _cycle, _master_increase, _master_decrease should be
+    # in your tiling class. (_layout, _cycle, _master_increase, _master_decrease should be
     # sufficient here. Along with the helper methods help_find_next and help_find_previous.)
     # We also initialize this tiler's "state"- this will automatically save certain things for
     # us, like the sizes of panes.
@@ -129,14 +221,43 @@ class Tile:
 
     #
     # The core of the tiling algorithm. This will be called whenever PyTyle senses
-    # that a screen needs to be re-tiled. It is essentially the bread and butter of
-    # your tiling algorithm. It is responsible for placing *all* masters and slaves
-    # in the TileStorage on the screen (unless you desire other behavior, like a
-    # limited number of windows, but the behavior could be unpredictable). See the
-    # respective tile methods in the algorithms shipped with this release.
+    # that a screen needs to be re-tiled. It is responsible for placing *all*
+    # masters and slaves in the TileStorage on the screen.
+    #
+    # By default, it asks the layout (see _layout) where everything goes, and
+    # then puts it there (see help_apply). So you probably want to overload
+    # _layout instead. (Unless you need to do something a layout can't, like
+    # raising the active window. See Cascade.)
     #
     def _tile(self):
-        pass
+        masters = self.storage.get_masters()
+        slaves = self.storage.get_slaves()
+
+        layout = self.help_layout(self.screen.get_workarea(), len(masters), len(slaves), self.help_layout_options(masters, slaves))
+        self.help_apply(masters + slaves, layout)
+
+    #
+    # This is the bread and butter of your tiling algorithm. Given the workarea
+    # (a tuple of x, y, width and height), the *number* of masters and slaves,
+    # and a dict of options (see help_layout_options), figure out where every
+    # window goes. Return a tuple of (cells, stack):
+    #
+    #    cells - A list with a tuple of (x, y, width, height, margin) for each
+    #            window. Masters come first, followed by slaves, in the order
+    #            they're in the TileStorage.
+    #    stack - A list of indices into cells. Those windows are raised, in
+    #            that order, after everything has been resized. (Most layouts
+    #            don't care about stacking, and just return an empty list.)
+    #
+    # Note: A layout should *only* look at its arguments- not at the screen,
+    # the windows or the tiler state. That's what makes it possible to work
+    # out a layout without X.
+    #
+    # See the respective layout methods in the algorithms shipped with this
+    # release.
+    #
+    def _layout(self, workarea, masters, slaves, options):
+        return ([], [])
 
     #
     # There is probably no need to overload this one. It simply iterates over all
@@ -146,7 +267,7 @@ class Tile:
     def _untile(self):
         # just resize all the windows back to their original x/y/width/height
         for window in self.storage.get_all():
-            if Config.misc('original_decor'):
+            if Config.SNAPSHOT.misc.original_decor:
                 window.add_decorations()
             else:
                 window.remove_decorations()
@@ -264,7 +385,7 @@ class Tile:
     def _add_master(self):
         # use active window if it's a slave
         slaves = self.storage.get_slaves()
-        if self.screen.get_active().id in self.storage.get_slaves_by_id():
+        if self.storage.is_slave(self.screen.get_active()):
             self.storage.inc_master_count()
             self.storage.remove(self.screen.get_active())
             self.storage.add(self.screen.get_active())
@@ -294,7 +415,7 @@ class Tile:
 
         # make sure the current window is a master...
         masters = self.storage.get_masters()
-        if self.screen.get_active().id in self.storage.get_masters_by_id():
+        if self.storage.is_master(self.screen.get_active()):
             self.storage.dec_master_count()
             self.storage.remove(self.screen.get_active())
             self.storage.add(self.screen.get_active())
@@ -413,7 +534,88 @@ class Tile:
             window.save_geometry()
 
     #
-    # Resizes the given window. Takes into account its decorations.
+    # Puts the given windows where the layout says they should go. (See _layout.)
+    # The windows should be in the same order as the cells of the layout- masters
+    # first, then slaves.
+    #
+    def help_apply(self, windows, layout):
+        cells, stack = layout
+
+        for window, cell in zip(windows, cells):
+            self.help_resize(window, *cell)
+
+        for i in stack:
+            windows[i].stack_raise()
+
+    #
+    # Fetches the layout for the given arguments (see _layout). If we've seen
+    # them before- from any screen and any tiler of the same kind- then we
+    # already know the answer. Otherwise, ask _layout and remember it.
+    #
+    # Note: Cached layouts are shared, so don't change them.
+    #
+    def help_layout(self, workarea, masters, slaves, options):
+        key = (self.__class__, tuple(workarea), masters, slaves, tuple(sorted(options.items())))
+
+        if key in Tile._LAYOUTS:
+            Tile._LAYOUT_HITS += 1
+            layout = Tile._LAYOUTS.pop(key)
+        else:
+            Tile._LAYOUT_MISSES += 1
+            cells, stack = self._layout(workarea, masters, slaves, options)
+            layout = (tuple(cells), tuple(stack))
+
+            if len(Tile._LAYOUTS) >= Tile._LAYOUTS_MAX:
+                Tile._LAYOUTS.popitem(last = False)
+
+        # most recently used goes last...
+        Tile._LAYOUTS[key] = layout
+        return layout
+
+    #
+    # Collects the options that the layout needs (see _layout) from the tiler
+    # state. Which ones is up to LAYOUT_OPTIONS. Overload this if your layout
+    # needs something from the windows themselves. (See Cascade.)
+    #
+    def help_layout_options(self, masters, slaves):
+        options = {}
+        for name in self.LAYOUT_OPTIONS:
+            options[name] = self.state.get(name)
+        return options
+
+    #
+    # Moves the given layout option (a fraction of the screen, like width_factor)
+    # by delta and tiles the screen again with it. This is what master_increase
+    # and master_decrease boil down to for most tilers. Won't do anything if
+    # there are either no masters or no slaves, or if the masters would take up
+    # none (or all) of the screen.
+    #
+    # Note: We go through _tile instead of resizing the windows ourselves, so
+    # that the layout cache and Window.applied stay honest. (Otherwise the next
+    # tiling pass could undo the resize, or skip windows it shouldn't.)
+    #
+    # Note 2: The option is rounded so that adding and taking away 0.05 a bunch
+    # of times gets us back to exactly where we started. (Floats...)
+    #
+    def help_factor(self, name, delta):
+        if not self.storage.get_masters() or not self.storage.get_slaves():
+            return
+
+        value = round(self.state.get(name) + delta, 2)
+        if value <= 0 or value >= 1:
+            return
+
+        self.state.set(name, value)
+        self._tile()
+
+    #
+    # Resizes the given window. Takes into account its decorations. Returns
+    # True if the window was resized.
+    #
+    # Note: If the window is already exactly where the last tiling pass put it
+    # (and nothing has happened to it since- see Window.applied), then we don't
+    # bother X about it at all. Opening one window usually only moves a few
+    # others around, so this skips most of the work.
     #
     def help_resize(self, window, x, y, width, height, margin = 0):
         if margin > 0:
@@ -422,19 +624,35 @@ class Tile:
             width -= (2 * margin)
             height -= (2 * margin)
 
+        decorations = Config.SNAPSHOT.misc.decorations
+        original_decor = Config.SNAPSHOT.misc.original_decor
+
+        if decorations:
+            geom = (int(x), int(y), int(width - window.d_left - window.d_right), int(height - window.d_top - window.d_bottom))
+        else:
+            geom = (int(x), int(y), int(width - 2), int(height - 2))
+
+        applied = geom + (decorations, original_decor)
+        if window.applied == applied:
+            Tile._SKIPPED += 1
+            return False
+
         if window.static:
             window.remove_static_property()
 
-        if Config.misc('decorations'):
-            if not Config.misc('original_decor'):
+        if decorations:
+            if not original_decor:
                 window.add_decorations()
-
-            window.resize(int(x), int(y), int(width - window.d_left - window.d_right), int(height - window.d_top - window.d_bottom))
         else:
-            if Config.misc('original_decor'):
+            if original_decor:
                 window.remove_decorations()
 
-            window.resize(int(x), int(y), int(width - 2), int(height - 2))
+        if not window.resize(*geom):
+            return False
+
+        window.applied = applied
+        Tile._RESIZED += 1
+        return True
 
     #
     # Reloads the entire storage container underlying the tiling algorithm.
@@ -455,16 +673,14 @@ class Tile:
 
         # gobble up active window first in case we need a master...
         # and then just add away...
-        masters = self.storage.get_masters_by_id()
+        masters = self.storage.get_masters()
 
-        if self.screen.get_active() and len(masters) < self.storage.get_master_count() and self.screen.get_active().id in self.screen.windows and self.screen.get_active().id not in masters:
+        if self.screen.get_active() and len(masters) < self.storage.get_master_count() and self.screen.get_active().id in self.screen.windows and not self.storage.is_master(self.screen.get_active()):
             self.storage.remove(self.screen.get_active())
             self.storage.add(self.screen.get_active())
-            masters = self.storage.get_masters_by_id()
 
-        all = self.storage.get_all_by_id()
         for window in self.screen.windows.values():
-            if not window.id in all:
+            if not self.storage.contains(window):
                 self.storage.add_bottom(window)
             else:
                 self.storage.try_to_promote(window)
@@ -479,8 +695,12 @@ class Tile:
             return
 
         newpos = [win2.x, win2.y, win2.width, win2.height]
-        win2.resize(win1.x, win1.y, win1.width, win1.height)
-        win1.resize(newpos[0], newpos[1], newpos[2], newpos[3])
+        PROBE.begin()
+        try:
+            win2.resize(win1.x, win1.y, win1.width, win1.height)
+            win1.resize(newpos[0], newpos[1], newpos[2], newpos[3])
+        finally:
+            PROBE.commit()
 
         self.storage.switch(win1, win2)
 
@@ -509,6 +729,10 @@ class Tile:
     # These should not be overloaded, but rather their equivalent member methods
     # preceded with an "_" should be overloaded to customize your tiling algorithm.
     #
+    # Note: The ones that move a bunch of windows around (tile, untile and the
+    # master_* methods) run inside a PROBE transaction, so all of the resizing
+    # reaches X in a single write.
+    #
     # You can get cursory information about these methods from the configuration
     # file, or you may peruse their comments above (in this class), and/or may
     # also take a look at the comments in Tilers/TileDefault.py,
@@ -526,20 +750,34 @@ class Tile:
             self.help_reload()
 
         self.screen.enable_tiling()
-        self._tile()
+        Tile._RESIZED = 0
+        Tile._SKIPPED = 0
+        PROBE.begin()
+        try:
+            self._tile()
+        finally:
+            PROBE.commit()
         self.screen.got_tiling()
 
+        if Config.DEBUG:
+            DEBUG.write("Tiled screen %d: resized %d window(s), skipped %d" % (self.screen.id, Tile._RESIZED, Tile._SKIPPED))
+
     def untile(self):
-        self._untile()
+        PROBE.begin()
+        try:
+            self._untile()
+        finally:
+            PROBE.commit()
         self.screen.disable_tiling()
 
     def cycle_tiler(self):
-        for i in range(len(Config.misc('tilers'))):
-            if Config.misc('tilers')[i] is self.__class__.__name__:
-                if (i + 1) == len(Config.misc('tilers')):
-                    self.screen.set_tiler(Config.tilers(Config.misc('tilers')[0]))
+        tilers = Config.SNAPSHOT.misc.tilers
+        for i in range(len(tilers)):
+            if tilers[i] is self.__class__.__name__:
+                if (i + 1) == len(tilers):
+                    self.screen.set_tiler(Config.tilers(tilers[0]))
                 else:
-                    self.screen.set_tiler(Config.tilers(Config.misc('tilers')[i + 1]))
+                    self.screen.set_tiler(Config.tilers(tilers[i + 1]))
 
         self._reset()
 
@@ -571,10 +809,18 @@ class Tile:
         self._screen_put(2)
 
     def master_increase(self):
-        self._master_increase()
+        PROBE.begin()
+        try:
+            self._master_increase()
+        finally:
+            PROBE.commit()
 
     def master_decrease(self):
-        self._master_decrease()
+        PROBE.begin()
+        try:
+            self._master_decrease()
+        finally:
+            PROBE.commit()
 
     def add_master(self):
         self._add_master()
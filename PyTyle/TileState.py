@@ -46,13 +46,17 @@ class TileState:
     # config (and copy this value to our current state). Otherwise
     # return nothing- we don't have a state yet.
     #
+    # Note: The layout config comes from the snapshot (see
+    # Config.SNAPSHOT), so the defaults are already filled in.
+    #
     def get(self, key):
         if key in self._state:
             return self._state[key]
-        elif Config.layout(self._tiler, key) is not None:
-            self.set(key, Config.layout(self._tiler, key))
-            return Config.layout(self._tiler, key)
-        return None
+
+        value = Config.SNAPSHOT.layouts.get(self._tiler.__class__.__name__, {}).get(key)
+        if value is not None:
+            self.set(key, value)
+        return value
     
     #
     # Empties the current state. Remember, the state *starts* as
@@ -44,12 +44,28 @@ class TileStorage:
     
     #
     # Will start the master count at 1, and initialize the master and slave
-    # *ordered* lists.
+    # *ordered* storage.
+    #
+    # How it's stored: masters and slaves are each a dict mapping a window id
+    # to a [rank, window] pair. The order of the windows is the order of their
+    # ranks. Adding to the bottom takes a rank bigger than any we've given out,
+    # and adding to the top takes one smaller. So adding, removing, switching
+    # and finding a window are all just dict operations- no scanning lists.
+    #
+    # The ordered lists that tilers ask for (get_masters, get_slaves, etc) are
+    # built (and sorted) the first time they're asked for. After that, adding,
+    # removing and switching windows fix up the lists in place, instead of
+    # building them again. (Only sort, and adding a window that's already in
+    # the storage, start over.) Tilers always get a copy, so they're free to
+    # change it- but that means every get_* is a copy of the whole list.
     #
     def __init__(self):
         self._master_count = 1
-        self._masters = []
-        self._slaves = []
+        self._masters = {}
+        self._slaves = {}
+        self._top = 0
+        self._bottom = 0
+        self._views = {}
         
     #
     # Adds a window to the storage. This will detect if that window should
@@ -60,7 +76,7 @@ class TileStorage:
         if window.hidden: return
         
         if len(self._masters) < self.get_master_count():
-            if window.id in self.get_slaves_by_id():
+            if self.is_slave(window):
                 self._remove_slave(window)
             self._add_master(window)
         else:
@@ -70,7 +86,7 @@ class TileStorage:
         if window.hidden: return
         
         if len(self._masters) < self.get_master_count():
-            if window.id in self.get_slaves_by_id():
+            if self.is_slave(window):
                 self._remove_slave(window)
             self._add_top_master(window)
         else:
@@ -80,12 +96,18 @@ class TileStorage:
         if window.hidden: return
         
         if len(self._masters) < self.get_master_count():
-            if window.id in self.get_slaves_by_id():
+            if self.is_slave(window):
                 self._remove_slave(window)
             self._add_bottom_master(window)
         else:
             self._add_bottom_slave(window)
         
+    #
+    # Reports whether the given window is in the storage at all.
+    #
+    def contains(self, window):
+        return window.id in self._masters or window.id in self._slaves
+
     #
     # Decrements the number of masters allowed for this tiler. It cannot
     # go below 0 for obvious reasons (but can be equal to 0).
@@ -95,30 +117,29 @@ class TileStorage:
         self._master_count -= 1
     
     #
-    # Returns all windows currently in the storage.
+    # Returns all windows currently in the storage. (This, and the rest of the
+    # get_* lists, are copies. See __init__.)
     #    
     def get_all(self):
-        return self.get_masters() + self.get_slaves()
+        return list(self._view('all'))
     
     #
     # Returns all windows currently in the storage by their id.
     #
     def get_all_by_id(self):
-        return self.get_masters_by_id() + self.get_slaves_by_id()
+        return list(self._view('all_by_id'))
     
     #
-    # Returns all masters currently in the storage. It will
-    # conveniently extract the windows from the tupling storage
-    # mechanism.
+    # Returns all masters currently in the storage, in order.
     #
     def get_masters(self):
-        return [window for (title, window) in self._masters]
+        return list(self._view('masters'))
     
     #
     # Returns all the masters' ids.
     #
     def get_masters_by_id(self):
-        return [window.id for (title, window) in self._masters]
+        return list(self._view('masters_by_id'))
     
     #
     # Returns the number of masters currently allowed.
@@ -127,16 +148,16 @@ class TileStorage:
         return self._master_count
     
     #
-    # Returns all slaves currently in the storage.
+    # Returns all slaves currently in the storage, in order.
     #
     def get_slaves(self):
-        return [window for (title, window) in self._slaves]
+        return list(self._view('slaves'))
     
     #
     # Returns all slaves' ids.
     #
     def get_slaves_by_id(self):
-        return [window.id for (title, window) in self._slaves]
+        return list(self._view('slaves_by_id'))
     
     #
     # Tells the tiling storage to allow for one more master.
@@ -152,13 +173,27 @@ class TileStorage:
     def inc_master_count(self):
         self._master_count += 1
         
+    #
+    # Reports whether the given window is a master. Use this instead of
+    # searching get_masters_by_id.
+    #
+    def is_master(self, window):
+        return window.id in self._masters
+
+    #
+    # Reports whether the given window is a slave. Use this instead of
+    # searching get_slaves_by_id.
+    #
+    def is_slave(self, window):
+        return window.id in self._slaves
+
     #
     # Removes a window from the storage.
     #
     def remove(self, window):
-        if window.id in self.get_masters_by_id():
+        if self.is_master(window):
             self._remove_master(window)
-        if window.id in self.get_slaves_by_id():
+        if self.is_slave(window):
             self._remove_slave(window)
             
     #
@@ -168,29 +203,47 @@ class TileStorage:
     # introduce inconsistencies between the storage and
     # the screen.
     #
+    # Note: Windows are sorted by title. Windows with the
+    # same title keep their current order.
+    #
     def sort(self):
-        self._masters.sort()
-        self._slaves.sort()
+        for group in (self._masters, self._slaves):
+            entries = sorted(group.values(), key = lambda entry: (entry[1].title.lower(), entry[0]))
+            for entry in entries:
+                self._bottom += 1
+                entry[0] = self._bottom
+        self._views = {}
         
     #
     # Will switch any two windows. This preseves the
     # representation of storage as it pertains to the
     # screen's physical appearence.
     #
+    # Note: The windows swap places- rank and all. (If only
+    # one of them is in the storage, the other one takes its
+    # place.) The order of everything else stays the same, so
+    # the cached lists are fixed up instead of rebuilt.
+    #
     def switch(self, win1, win2):
-        for i in range(len(self._masters)):
-            win = self._masters[i][1]
-            if win1.id == win.id:
-                self._masters[i] = (win2.title.lower(), win2)
-            if win2.id == win.id:
-                self._masters[i] = (win1.title.lower(), win1)
-        
-        for i in range(len(self._slaves)):
-            win = self._slaves[i][1]
-            if win1.id == win.id:
-                self._slaves[i] = (win2.title.lower(), win2)
-            if win2.id == win.id:
-                self._slaves[i] = (win1.title.lower(), win1)
+        if win1.id == win2.id:
+            return
+
+        group1 = self._group(win1)
+        group2 = self._group(win2)
+
+        if group1 is not None:
+            rank1 = group1.pop(win1.id)[0]
+        if group2 is not None:
+            rank2 = group2.pop(win2.id)[0]
+
+        if group1 is not None:
+            group1[win2.id] = [rank1, win2]
+        if group2 is not None:
+            group2[win1.id] = [rank2, win1]
+
+        for name in ('masters', 'slaves', 'all'):
+            if name in self._views:
+                self._swap(name, win1, win2)
                 
     #
     # This will try to promote a given window (has to be
@@ -199,7 +252,7 @@ class TileStorage:
     # masters.)
     #
     def try_to_promote(self, window):
-        if len(self._masters) < self.get_master_count() and window.id in self.get_slaves_by_id():
+        if len(self._masters) < self.get_master_count() and self.is_slave(window):
             self._remove_slave(window)
             self._add_master(window)
     
@@ -214,17 +267,13 @@ class TileStorage:
     # count.
     #
     def _add_master(self, window):
-        self._masters.append(
-                            (window.title.lower(), window)
-                            )
+        self._add_bottom(self._masters, window)
         
     #
     # Explicitly adds a slave to the storage.
     #
     def _add_slave(self, window):
-        self._slaves.append(
-                           (window.title.lower(), window)
-                           )
+        self._add_bottom(self._slaves, window)
     
     #
     # Explicitly adds a master to the storage. Please do not
@@ -232,17 +281,13 @@ class TileStorage:
     # count.
     #
     def _add_bottom_master(self, window):
-        self._masters.append(
-                            (window.title.lower(), window)
-                            )
+        self._add_bottom(self._masters, window)
         
     #
     # Explicitly adds a slave to the storage.
     #
     def _add_bottom_slave(self, window):
-        self._slaves.append(
-                           (window.title.lower(), window)
-                           )
+        self._add_bottom(self._slaves, window)
         
     #
     # Explicitly adds a master to the storage. Please do not
@@ -250,37 +295,171 @@ class TileStorage:
     # count.
     #
     def _add_top_master(self, window):
-        self._masters.insert(0,
-                            (window.title.lower(), window)
-                            )
+        self._add_top(self._masters, window)
         
     #
     # Explicitly adds a slave to the storage.
     #
     def _add_top_slave(self, window):
-        self._slaves.insert(0,
-                           (window.title.lower(), window)
-                           )
+        self._add_top(self._slaves, window)
     
     #
     # Explicitly removes a master from the storage.
     #        
     def _remove_master(self, window):
-        for i in range(len(self._masters)):
-            win = self._masters[i][1]
-            if window.id == win.id:
-                del self._masters[i]
-                break
+        if window.id in self._masters:
+            del self._masters[window.id]
+            self._view_delete('masters', window)
+            self._view_delete('all', window)
      
     #
     # Explicitly removes a slave from the storage.
     #       
     def _remove_slave(self, window):
-        for i in range(len(self._slaves)):
-            win = self._slaves[i][1]
-            if window.id == win.id:
-                del self._slaves[i]
-                break
+        if window.id in self._slaves:
+            del self._slaves[window.id]
+            self._view_delete('slaves', window)
+            self._view_delete('all', window)
+
+    #
+    # Puts a window at the bottom (or top) of the given group, by giving
+    # it a rank bigger (or smaller) than any other.
+    #
+    def _add_bottom(self, group, window):
+        if window.id in group:
+            self._views = {}
+
+        self._bottom += 1
+        group[window.id] = [self._bottom, window]
+        self._view_add(group, window, False)
+
+    def _add_top(self, group, window):
+        if window.id in group:
+            self._views = {}
+
+        self._top -= 1
+        group[window.id] = [self._top, window]
+        self._view_add(group, window, True)
+
+    #
+    # Puts a window that was just added to the top (or bottom) of the given
+    # group into the cached lists. Masters come before slaves in "all".
+    #
+    def _view_add(self, group, window, top):
+        if not self._views:
+            return
+
+        if group is self._masters:
+            name, offset = 'masters', 0
+        else:
+            name, offset = 'slaves', len(self._masters)
+
+        pos = 0 if top else len(group) - 1
+        self._view_insert(name, pos, window)
+        self._view_insert('all', offset + pos, window)
+
+    #
+    # Inserts a window into one of the cached lists (and its list of ids),
+    # if we have it. The map of positions (see _swap) only survives if the
+    # window went on the end- otherwise everything after it moved, and it's
+    # cheaper to build the map again if switch ever needs it.
+    #
+    def _view_insert(self, name, pos, window):
+        if name not in self._views:
+            return
+
+        view = self._views[name]
+        view.insert(pos, window)
+        if name + '_by_id' in self._views:
+            self._views[name + '_by_id'].insert(pos, window.id)
+
+        if name + '_at' in self._views:
+            if pos == len(view) - 1:
+                self._views[name + '_at'][window.id] = pos
+            else:
+                del self._views[name + '_at']
+
+    #
+    # Takes a window out of one of the cached lists (and its list of ids), if
+    # we have it. The window is found with the map of positions if there is
+    # one, and with the list of ids otherwise. (Comparing ids is a lot faster
+    # than comparing windows.)
+    #
+    def _view_delete(self, name, window):
+        if name not in self._views:
+            return
+
+        view = self._views[name]
+        if name + '_at' in self._views:
+            pos = self._views[name + '_at'].pop(window.id)
+        else:
+            pos = self._view(name + '_by_id').index(window.id)
+
+        del view[pos]
+        if name + '_by_id' in self._views:
+            del self._views[name + '_by_id'][pos]
+
+        if name + '_at' in self._views and pos != len(view):
+            del self._views[name + '_at']
+
+    #
+    # Returns the group (masters or slaves) that the window is in, or None.
+    #
+    def _group(self, window):
+        if window.id in self._masters:
+            return self._masters
+        if window.id in self._slaves:
+            return self._slaves
+        return None
+
+    #
+    # Returns the windows in the given group, in order of rank.
+    #
+    def _ordered(self, group):
+        return [window for (rank, window) in sorted(group.values())]
+
+    #
+    # Swaps two windows in one of the cached lists (and its list of ids, if
+    # we have that too), in place. If only one of them is in the list, the
+    # other one takes its place.
+    #
+    # To find them without scanning the list, each list gets a map of window
+    # id to position the first time we switch something in it. (It's cached
+    # with the list, and thrown out with it too.)
+    #
+    def _swap(self, name, win1, win2):
+        view = self._views[name]
+        ids = self._views.get(name + '_by_id')
+
+        if name + '_at' not in self._views:
+            self._views[name + '_at'] = dict([(window.id, i) for (i, window) in enumerate(view)])
+        at = self._views[name + '_at']
+
+        i = at.pop(win1.id, None)
+        j = at.pop(win2.id, None)
+
+        for (pos, window) in ((i, win2), (j, win1)):
+            if pos is not None:
+                view[pos] = window
+                at[window.id] = pos
+                if ids is not None:
+                    ids[pos] = window.id
+
+    #
+    # Returns one of the cached ordered lists (see __init__), building it
+    # first if we have to. Don't hand these out- they belong to the storage.
+    #
+    def _view(self, name):
+        if name not in self._views:
+            if name == 'masters':
+                self._views[name] = self._ordered(self._masters)
+            elif name == 'slaves':
+                self._views[name] = self._ordered(self._slaves)
+            elif name == 'all':
+                self._views[name] = self._view('masters') + self._view('slaves')
+            else:
+                self._views[name] = [window.id for window in self._view(name[:-len('_by_id')])]
+        return self._views[name]
     
     #
     # A nice output of the current storage. Useful for
@@ -289,10 +468,10 @@ class TileStorage:
     def __str__(self):
         ret = 'Master(s):\n'
         for master in self.get_masters():
-            ret += '\t%s - %s\n' % (master.title, master.id)
+            ret += '\t%s - %s\n' % (master.title, hex(master.id))
         
         ret += 'Slave(s):\n'
         for slave in self.get_slaves():
-            ret += '\t%s - %s\n' % (slave.title, slave.id)
+            ret += '\t%s - %s\n' % (slave.title, hex(slave.id))
             
-        return ret
\ No newline at end of file
+        return ret
@@ -27,68 +27,74 @@ we're able to access the window decoration sizes.
 from PyTyle.Tilers.TileDefault import TileDefault
 
 class Cascade (TileDefault):
+    #------------------------------------------------------------------------------
+    # CLASS VARIABLES
+    #------------------------------------------------------------------------------
+
+    LAYOUT_OPTIONS = ('decoration_height', 'push_over', 'horz_align', 'width_factor', 'height_factor')
+
+
     #------------------------------------------------------------------------------
     # OVERLOADED INSTANCE METHODS
     #------------------------------------------------------------------------------
         
+    #
+    # Lays everything out (see _layout), and then raises the active window.
+    # (The layout can't know which window is active.)
+    #
+    def _tile(self):
+        TileDefault._tile(self)
+            
+        # just in case...
+        self.screen.get_active().stack_raise()
+        
     #
     # This Cascade layout will essentially do the following:
     #    1. The first window (or bottom) window takes up the full screen.
     #    2. Each subsequent window has its height shrinked by the height of
     #       the window decoration.
     #
-    def _tile(self):
-        x, y, width, height = self.screen.get_workarea()
-        
-        # set some vars...
-        masters = self.storage.get_masters()
-        slaves = self.storage.get_slaves()
-        
-        # If we don't have any decorations... use hard coded value for now
-        if masters and masters[0].d_top:
-            decor = masters[0].d_top
-        elif slaves and slaves[0].d_top:
-            decor = slaves[0].d_top
-        else:
-            decor = self.state.get('decoration_height')
+    # Every window is raised in order (slaves first), so that the stack looks
+    # like a cascade.
+    #
+    def _layout(self, workarea, masters, slaves, options):
+        x, y, width, height = workarea
+        decor = options['decoration_height']
         
-        push_over = self.state.get('push_over')
+        push_over = options['push_over']
         push_width = push_over
-        if self.state.get('horz_align') == 'right':
+        if options['horz_align'] == 'right':
             push_over = -push_over
         
-        masterWidth = (width * self.state.get('width_factor')) - (push_width * len(slaves))
-        masterHeight = (height * self.state.get('height_factor')) - (decor * len(slaves))
-        masterY = y + (decor * len(slaves))
+        masterWidth = (width * options['width_factor']) - (push_width * slaves)
+        masterHeight = (height * options['height_factor']) - (decor * slaves)
+        masterY = y + (decor * slaves)
         
-        slaveWidth = width * self.state.get('width_factor')
-        slaveHeight = height * self.state.get('height_factor')
+        slaveWidth = width * options['width_factor']
+        slaveHeight = height * options['height_factor']
         slaveY = y
         
-        if self.state.get('horz_align') == 'right':
-            masterX = x + (width - masterWidth) + (push_over * len(slaves))
+        if options['horz_align'] == 'right':
+            masterX = x + (width - masterWidth) + (push_over * slaves)
             slaveX = x + (width - slaveWidth)
             push_over = 0
         else:
-            masterX = x + (push_over * len(slaves))
+            masterX = x + (push_over * slaves)
             slaveX = x
         
-        # now resize the rest... keep track of heights/positioning
-        for slave in slaves:
-            self.help_resize(slave, slaveX, slaveY, slaveWidth, slaveHeight)
+        # masters come first in the cells, but go on top of the stack...
+        cells = [(masterX, masterY, masterWidth, masterHeight, 0)] * masters
+        stack = range(masters, masters + slaves) + range(masters)
+        
+        # now place the rest... keep track of heights/positioning
+        for i in range(slaves):
+            cells.append((slaveX, slaveY, slaveWidth, slaveHeight, 0))
             slaveY += decor
             slaveHeight -= decor
             slaveWidth -= push_width
             slaveX += push_over
-            slave.stack_raise()
-            
-        # resize the master windows
-        for master in masters:
-            self.help_resize(master, masterX, masterY, masterWidth, masterHeight)
-            master.stack_raise()
             
-        # just in case...
-        self.screen.get_active().stack_raise()
+        return (cells, stack)
     
     #
     # Not changing much functionality here. Just overloading, inheriting, and
@@ -139,6 +145,21 @@ class Cascade (TileDefault):
     # PRIVATE HELPER METHODS
     #------------------------------------------------------------------------------
     
+    #
+    # The layout wants the height of a window's title bar. Use the first
+    # window's real decorations if we know them, otherwise fall back to the
+    # configured value.
+    #
+    def help_layout_options(self, masters, slaves):
+        options = TileDefault.help_layout_options(self, masters, slaves)
+        
+        if masters and masters[0].d_top:
+            options['decoration_height'] = masters[0].d_top
+        elif slaves and slaves[0].d_top:
+            options['decoration_height'] = slaves[0].d_top
+            
+        return options
+    
     #
     # Same exact thing as Tile.help_reload, except we add to the top
     # of the window stack instead.
@@ -151,16 +172,14 @@ class Cascade (TileDefault):
                 
         # gobble up active window first in case we need a master...
         # and then just add away...
-        masters = self.storage.get_masters_by_id()
+        masters = self.storage.get_masters()
         
-        if self.screen.get_active() and len(masters) < self.storage.get_master_count() and self.screen.get_active().id in self.screen.windows and self.screen.get_active().id not in masters:
+        if self.screen.get_active() and len(masters) < self.storage.get_master_count() and self.screen.get_active().id in self.screen.windows and not self.storage.is_master(self.screen.get_active()):
             self.storage.remove(self.screen.get_active())
             self.storage.add(self.screen.get_active())
-            masters = self.storage.get_masters_by_id()                
         
-        all = self.storage.get_all_by_id()
         for window in self.screen.windows.values():
-            if not window.id in all:
+            if not self.storage.contains(window):
                 self.storage.add_top(window)
             else:
                 self.storage.try_to_promote(window) 
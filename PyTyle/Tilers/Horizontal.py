@@ -34,93 +34,48 @@ for an example). This is so tiling algorithms can be dynamically loaded.
 """
 
 from PyTyle.Tilers.TileDefault import TileDefault
+from PyTyle.Kernel import Kernel
 
 class Horizontal (TileDefault):
+    LAYOUT_OPTIONS = ('height_factor', 'margin')
+
     #
     # The core tiling algorithm. Every core tiling algorithm should start with
-    # grabbing the current screen's workarea and factoring that into your
-    # calculations. Feel free to follow my approach to tiling algorithms, or
-    # come up with something else.
+    # the workarea it's given and factor that into its calculations. Feel free
+    # to follow my approach to tiling algorithms, or come up with something else.
     #
-    # Note: As I've been going through the source code writing these comments,
-    # I've been thinking about generalizing tiling algorithms even more. So this
-    # approach could change a little in the future. (Although I imagine the class
-    # hierarchy will be staying the same, I like it.)
+    # Masters are lined up side by side along the top, and slaves are lined up
+    # side by side along the bottom. (See Kernel.row.)
     #
-    def _tile(self):
-        x, y, width, height = self.screen.get_workarea()
-
-        # set some vars...
-        masters = self.storage.get_masters()
-        slaves = self.storage.get_slaves()
+    def _layout(self, workarea, masters, slaves, options):
+        x, y, width, height = workarea
+        margin = options['margin']
 
-        masterWidth = width if not masters else (width / len(masters))
-        masterHeight = height if not slaves else int(height * self.state.get('height_factor'))
+        masterHeight = height if not slaves else int(height * options['height_factor'])
         masterY = y
-        masterX = x
 
-        slaveWidth = width if not slaves else (width / len(slaves))
         slaveHeight = height if not masters else height - masterHeight
         slaveY = y if not masters else (y + masterHeight)
-        slaveX = x
 
-        # resize the master windows
-        for master in masters:
-            self.help_resize(master, masterX, masterY, masterWidth, masterHeight, self.state.get('margin'))
-            masterX += masterWidth
+        cells = Kernel.row(x, masterY, width, masterHeight, masters, margin)
+        cells += Kernel.row(x, slaveY, width, slaveHeight, slaves, margin)
 
-        # now resize the rest... keep track of heights/positioning
-        for slave in slaves:
-            self.help_resize(slave, slaveX, slaveY, slaveWidth, slaveHeight, self.state.get('margin'))
-            slaveX += slaveWidth
+        return (cells, [])
 
     #
-    # Increases the height of all master windows. Don't forget to decrease
-    # the height of all slave windows. Won't do anything if there are either
-    # no masters or no slaves.
+    # Increases the height of all master windows (and so decreases the height
+    # of all slave windows). Won't do anything if there are either no masters
+    # or no slaves. (See Tile.help_factor.)
     #
     def _master_increase(self, factor = 0.05):
-        x, y, width, height = self.screen.get_workarea()
-
-        slaves = self.storage.get_slaves()
-        masters = self.storage.get_masters()
-
-        # Stop if neither of either... haha
-        if not slaves or not masters:
-            return
-
-        # first calculate pixels...
-        pixels = int(((self.state.get('height_factor') + factor) * height) - (self.state.get('height_factor') * height))
-        self.state.set('height_factor', self.state.get('height_factor') + factor)
-
-        for slave in slaves:
-            slave.resize(slave.x, slave.y + pixels, slave.width, slave.height - pixels)
-        for master in masters:
-            master.resize(master.x, master.y, master.width, master.height + pixels)
+        self.help_factor('height_factor', factor)
 
     #
-    # Decreases the height of all master windows. Don't forget to increase
-    # the height of all slave windows. Won't do anything if there are either
-    # no masters or no slaves.
+    # Decreases the height of all master windows (and so increases the height
+    # of all slave windows). See _master_increase.
     #
     def _master_decrease(self, factor = 0.05):
-        x, y, width, height = self.screen.get_workarea()
-
-        slaves = self.storage.get_slaves()
-        masters = self.storage.get_masters()
-
-        # Stop if neither of either... haha
-        if not slaves or not masters:
-            return
-
-        # first calculate pixels...
-        pixels = int((self.state.get('height_factor') * height) - ((self.state.get('height_factor') - factor) * height))
-        self.state.set('height_factor', self.state.get('height_factor') - factor)
-
-        for slave in slaves:
-            slave.resize(slave.x, slave.y - pixels, slave.width, slave.height + pixels)
-        for master in masters:
-            master.resize(master.x, master.y, master.width, master.height - pixels)
+        self.help_factor('height_factor', -factor)
 
 # You must have this line's equivalent for your tiling algorithm!
 # This makes it possible to dynamically load tiling algorithms.
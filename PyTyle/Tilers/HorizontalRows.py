@@ -27,143 +27,44 @@ changed in the LAYOUT portion of the configuration file.
 """
 
 from PyTyle.Tilers.TileDefault import TileDefault
-import math
+from PyTyle.Kernel import Kernel
 
 class HorizontalRows (TileDefault):
+    LAYOUT_OPTIONS = ('height_factor', 'row_size', 'margin')
+
     #
     # Does almost the same thing as the Horizontal layout,
     # but is a bit more complex to account for multiple
-    # rows.
+    # rows. (See Kernel.grid.)
     #
-    def _tile(self):
-        x, y, width, height = self.screen.get_workarea()
-
-        # set some vars...
-        masters = self.storage.get_masters()
-        slaves = self.storage.get_slaves()
-        row_size = self.state.get('row_size')
-        rows = int(math.ceil(float(len(slaves)) / float(row_size)))
-        last_row_size = len(slaves) % row_size
-        if not last_row_size: last_row_size = row_size
+    def _layout(self, workarea, masters, slaves, options):
+        x, y, width, height = workarea
+        margin = options['margin']
 
-        masterWidth = width if not masters else (width / len(masters))
-        masterHeight = height if not slaves else int(height * self.state.get('height_factor'))
+        masterHeight = height if not slaves else int(height * options['height_factor'])
         masterY = y
-        masterX = x
 
-        slaveWidth = width if not slaves else (width / row_size)
-        slaveHeight = height if not slaves else ((height if not masters else height - masterHeight) / rows)
+        slaveHeight = height if not masters else height - masterHeight
         slaveY = y if not masters else (y + masterHeight)
-        slaveX = x
-
-        # resize the master windows
-        for master in masters:
-            self.help_resize(master, masterX, masterY, masterWidth, masterHeight, self.state.get('margin'))
-            masterX += masterWidth
-
-        current_row = 1
-        current_window = 1
-        for slave in slaves:
-            # last row!
-            if current_row == rows:
-                slaveWidth = width / last_row_size
-
-            self.help_resize(slave, slaveX, slaveY, slaveWidth, slaveHeight, self.state.get('margin'))
-            slaveX += slaveWidth
-
-            if current_window % row_size == 0:
-                current_row += 1
-                current_window = 1
-                slaveX = x
-                slaveY += slaveHeight
-            else:
-                current_window += 1
+
+        cells = Kernel.row(x, masterY, width, masterHeight, masters, margin)
+        cells += Kernel.grid(x, slaveY, width, slaveHeight, slaves, options['row_size'], margin)
+
+        return (cells, [])
 
     #
-    # This one is actually pretty neat. First we need to take care
-    # of our masters, which is pretty straight forward. Then we move
-    # the first row of slaves up by the regular pixel amount. Then the
-    # second row gets moved up slightly less (pixels - (pixels/rows))
-    # to be exact. And so on and so forth. Each row gets a height
-    # increase of pixels/rows.
-    #
-    # Note: We of course deal with integers here. In order to get around
-    # what could be a nasty rounding problem, we modify the pixel
-    # increase/decrease number right away to make sure it's a multiple
-    # of the number of rows. (We go down instead of up.)
+    # Increases the height of the master row. The rows of slaves split up
+    # whatever is left, just like they do when tiling. Won't do anything if
+    # there are either no masters or no slaves. (See Tile.help_factor.)
     #
     def _master_increase(self, factor = 0.05):
-        x, y, width, height = self.screen.get_workarea()
-        slaves = self.storage.get_slaves()
-        masters = self.storage.get_masters()
-        row_size = self.state.get('row_size')
-        rows = int(math.ceil(float(len(slaves)) / float(row_size)))
-
-        # Stop if neither of either... haha
-        if not slaves or not masters:
-            return
-
-        # first calculate pixels...
-        pixels = int(((self.state.get('height_factor') + factor) * height) - (self.state.get('height_factor') * height))
-        self.state.set('height_factor', self.state.get('height_factor') + factor)
-
-        # Make it easy... change pixels to next closest
-        # multiple of the number of rows...
-        pixels = pixels - (pixels % rows)
-        slave_pixels = pixels / rows
-
-        current_row = 1
-        current_window = 1
-        height_pixels = pixels
-        for slave in slaves:
-            slave.resize(slave.x, slave.y + height_pixels, slave.width, slave.height - slave_pixels)
-
-            if current_window % row_size == 0:
-                current_row += 1
-                current_window = 1
-                height_pixels -= slave_pixels
-            else:
-                current_window += 1
-        for master in masters:
-            master.resize(master.x, master.y, master.width, master.height + pixels)
+        self.help_factor('height_factor', factor)
 
     #
-    # See master_increase.
+    # See _master_increase.
     #
     def _master_decrease(self, factor = 0.05):
-        x, y, width, height = self.screen.get_workarea()
-        slaves = self.storage.get_slaves()
-        masters = self.storage.get_masters()
-        row_size = self.state.get('row_size')
-        rows = int(math.ceil(float(len(slaves)) / float(row_size)))
-
-        # Stop if neither of either... haha
-        if not slaves or not masters:
-            return
-
-        # first calculate pixels...
-        pixels = int((self.state.get('height_factor') * height) - ((self.state.get('height_factor') - factor) * height))
-        self.state.set('height_factor', self.state.get('height_factor') - factor)
-
-        # Make it easy... change pixels to next closest
-        # multiple of the number of rows...
-        pixels = pixels - (pixels % rows)
-        slave_pixels = pixels / rows
-
-        current_row = 1
-        current_window = 1
-        height_pixels = pixels
-        for slave in slaves:
-            slave.resize(slave.x, slave.y - height_pixels, slave.width, slave.height + slave_pixels)
-
-            if current_window % row_size == 0:
-                current_row += 1
-                current_window = 1
-                height_pixels -= slave_pixels
-            else:
-                current_window += 1
-        for master in masters:
-            master.resize(master.x, master.y, master.width, master.height - pixels)
+        self.help_factor('height_factor', -factor)
 
     #------------------------------------------------------------------------------
     # OVERLOADED PRIVATE HELPER METHODS
@@ -200,7 +101,7 @@ class HorizontalRows (TileDefault):
                 return slaves[0]
             else:
                 return masters[0]
-        elif slaves and self.screen.get_active().id in [win.id for win in slaves]:
+        elif slaves and self.storage.is_slave(self.screen.get_active()):
             for i in range(len(slaves) - 1):
                 if self.screen.get_active().id == slaves[i].id:
                     return slaves[(i + 1)]
@@ -229,7 +130,7 @@ class HorizontalRows (TileDefault):
                 return slaves[-1]
             else:
                 return masters[-1]
-        elif masters and self.screen.get_active().id in [win.id for win in masters]:
+        elif masters and self.storage.is_master(self.screen.get_active()):
             for i in range(1, len(masters)):
                 if self.screen.get_active().id == masters[i].id:
                     return masters[(i - 1)]
@@ -43,30 +43,11 @@ class Maximal (TileDefault):
     # height. (We aren't actually "maximizing" it here. This seemed to flow a
     # bit better with tiling in general.
     #
-    def _tile(self):
-        x, y, width, height = self.screen.get_workarea()
+    def _layout(self, workarea, masters, slaves, options):
+        x, y, width, height = workarea
         
-        # set some vars...
-        masters = self.storage.get_masters()
-        slaves = self.storage.get_slaves()
-        
-        masterWidth = width
-        masterHeight = height
-        masterY = y
-        masterX = x
-        
-        slaveWidth = width
-        slaveHeight = height
-        slaveY = y
-        slaveX = x
-        
-        # resize the master windows
-        for master in masters:
-            self.help_resize(master, masterX, masterY, masterWidth, masterHeight)
-        
-        # now resize the rest... keep track of heights/positioning
-        for slave in slaves:
-            self.help_resize(slave, slaveX, slaveY, slaveWidth, slaveHeight)   
+        # masters and slaves all get the same thing...
+        return ([(x, y, width, height, 0)] * (masters + slaves), [])
     
     #
     # We want to disable the following methods. They are of no use for this
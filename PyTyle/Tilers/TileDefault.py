@@ -95,7 +95,7 @@ class TileDefault (Tile):
         # Now that our edge cases are satisfied, we simply find where
         # we are, and iterate to find the next window. (Same for masters
         # and slaves.)
-        elif slaves and self.screen.get_active().id in [win.id for win in slaves]:
+        elif slaves and self.storage.is_slave(self.screen.get_active()):
             for i in range(len(slaves) - 1):
                 if self.screen.get_active().id == slaves[i].id:
                     return slaves[(i + 1)]
@@ -124,7 +124,7 @@ class TileDefault (Tile):
                 return slaves[-1]
             else:
                 return masters[0]
-        elif masters and self.screen.get_active().id in [win.id for win in masters]:
+        elif masters and self.storage.is_master(self.screen.get_active()):
             for i in range(len(masters) - 1):
                 if self.screen.get_active().id == masters[i].id:
                     return masters[(i + 1)]
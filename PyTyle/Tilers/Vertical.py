@@ -33,97 +33,57 @@ for an example). This is so tiling algorithms can be dynamically loaded.
 """
 
 from PyTyle.Tilers.TileDefault import TileDefault
+from PyTyle.Kernel import Kernel
 
 class Vertical (TileDefault):
+    #------------------------------------------------------------------------------
+    # CLASS VARIABLES
+    #------------------------------------------------------------------------------
+
+    LAYOUT_OPTIONS = ('width_factor', 'margin')
+
+
     #------------------------------------------------------------------------------
     # OVERLOADED INSTANCE METHODS
     #------------------------------------------------------------------------------
 
     #
     # The core tiling algorithm. Every core tiling algorithm should start with
-    # grabbing the current screen's workarea and factoring that into your
-    # calculations. Feel free to follow my approach to tiling algorithms, or
-    # come up with something else.
+    # the workarea it's given and factor that into its calculations. Feel free
+    # to follow my approach to tiling algorithms, or come up with something else.
     #
-    # Note: As I've been going through the source code writing these comments,
-    # I've been thinking about generalizing tiling algorithms even more. So this
-    # approach could change a little in the future. (Although I imagine the class
-    # hierarchy will be staying the same, I like it.)
+    # Masters are stacked on top of each other on the left, and slaves are
+    # stacked on top of each other on the right. (See Kernel.column.)
     #
-    def _tile(self):
-        x, y, width, height = self.screen.get_workarea()
-
-        # set some vars...
-        masters = self.storage.get_masters()
-        slaves = self.storage.get_slaves()
+    def _layout(self, workarea, masters, slaves, options):
+        x, y, width, height = workarea
+        margin = options['margin']
 
-        masterWidth = width if not slaves else int(width * self.state.get('width_factor'))
-        masterHeight = height if not masters else (height / len(masters))
-        masterY = y
+        masterWidth = width if not slaves else int(width * options['width_factor'])
         masterX = x
 
         slaveWidth = width if not masters else width - masterWidth
-        slaveHeight = height if not slaves else (height / len(slaves))
-        slaveY = y
         slaveX = x if not masters else (x + masterWidth)
 
-        # resize the master windows
-        for master in masters:
-            self.help_resize(master, masterX, masterY, masterWidth, masterHeight, self.state.get('margin'))
-            masterY += masterHeight
+        cells = Kernel.column(masterX, y, masterWidth, height, masters, margin)
+        cells += Kernel.column(slaveX, y, slaveWidth, height, slaves, margin)
 
-        # now resize the rest... keep track of heights/positioning
-        for slave in slaves:
-            self.help_resize(slave, slaveX, slaveY, slaveWidth, slaveHeight, self.state.get('margin'))
-            slaveY += slaveHeight
+        return (cells, [])
 
     #
-    # Increases the width of all master windows. Don't forget to decrease
-    # the width of all slave windows. Won't do anything if there are either
-    # no masters or no slaves.
+    # Increases the width of all master windows (and so decreases the width
+    # of all slave windows). Won't do anything if there are either no masters
+    # or no slaves. (See Tile.help_factor.)
     #
     def _master_increase(self, factor = 0.05):
-        x, y, width, height = self.screen.get_workarea()
-
-        slaves = self.storage.get_slaves()
-        masters = self.storage.get_masters()
-
-        # Stop if neither of either... haha
-        if not slaves or not masters:
-            return
-
-        # first calculate pixels...
-        pixels = int(((self.state.get('width_factor') + factor) * width) - (self.state.get('width_factor') * width))
-        self.state.set('width_factor', self.state.get('width_factor') + factor)
-
-        for slave in slaves:
-            slave.resize(slave.x + pixels, slave.y, slave.width - pixels, slave.height)
-        for master in masters:
-            master.resize(master.x, master.y, master.width + pixels, master.height)
+        self.help_factor('width_factor', factor)
 
     #
-    # Decreases the width of all master windows. Don't forget to increase
-    # the width of all slave windows. Won't do anything if there are either
-    # no masters or no slaves.
+    # Decreases the width of all master windows (and so increases the width
+    # of all slave windows). See _master_increase.
     #
     def _master_decrease(self, factor = 0.05):
-        x, y, width, height = self.screen.get_workarea()
-
-        slaves = self.storage.get_slaves()
-        masters = self.storage.get_masters()
-
-        # Stop if neither of either... haha
-        if not slaves or not masters:
-            return
-
-        # first calculate pixels...
-        pixels = int((self.state.get('width_factor') * width) - ((self.state.get('width_factor') - factor) * width))
-        self.state.set('width_factor', self.state.get('width_factor') - factor)
-
-        for slave in slaves:
-            slave.resize(slave.x - pixels, slave.y, slave.width + pixels, slave.height)
-        for master in masters:
-            master.resize(master.x, master.y, master.width - pixels, master.height)
+        self.help_factor('width_factor', -factor)
 
 # You must have this line's equivalent for your tiling algorithm!
 # This makes it possible to dynamically load tiling algorithms.
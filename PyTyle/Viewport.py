@@ -24,12 +24,21 @@ The Viewport class will handle all viewport related functionality. For instance,
 it provides methods to detect if a given window is on its viewport.
 """
 
+import weakref
+
 from PyTyle.State import State
 from PyTyle.Probe import PROBE
 
 from PyTyle.Screen import Screen
+from PyTyle.ScreenIndex import ScreenIndex
+
+class Viewport(object):
+    #
+    # See the note in Window. (The desktop is a weak reference- see desktop
+    # below.)
+    #
+    __slots__ = ('id', 'x', 'y', 'width', 'height', '_desktop', 'screens', '_SCREEN', '_index', '__weakref__')
 
-class Viewport:
     #------------------------------------------------------------------------------
     # CONSTRCUTOR AND VIEWPORT RELATED ATTRIBUTES/METHODS
     #------------------------------------------------------------------------------ 
@@ -56,6 +65,13 @@ class Viewport:
         self.screens = {}
         self.load_screens()
     
+    #
+    # Finds the screen that contains the given x,y coordinates, or None if
+    # there isn't one. (See ScreenIndex.)
+    #
+    def find_screen(self, x, y):
+        return self._index.find(x, y)
+
     #
     # Takes a pair of x,y coordinates and tells us whether they are in the
     # viewport's grid. Also, take special care for windows with a negative x,y
@@ -85,6 +101,19 @@ class Viewport:
             obj.x += self.x
             obj.y += self.y
             self.screens[screen['id']] = obj
+
+        self._index = ScreenIndex([self.screens[id] for id in sorted(self.screens)])
+
+    #
+    # The desktop that the viewport is on, or None if that desktop is gone.
+    #
+    def _get_desktop(self):
+        return self._desktop() if self._desktop else None
+
+    def _set_desktop(self, desktop):
+        self._desktop = weakref.ref(desktop) if desktop else None
+
+    desktop = property(_get_desktop, _set_desktop)
                 
     #
     # Updates viewport with attributes fetched from X.
@@ -39,25 +39,70 @@ windows in State?)
         windows are kept. This will *not* include hidden windows.
 """
 
+import weakref
+
 from PyTyle.Config import Config
 from PyTyle.State import State
 from PyTyle.Probe import PROBE
 
-class Window:
+class Window(object):
+    #
+    # There can be a lot of windows, so they only get room for the attributes
+    # listed here. (No per-window __dict__.) The title is fetched when it's
+    # first asked for (see title below), and we allow weak references so that
+    # screens don't keep closed windows alive. (See Screen.set_active.)
+    #
+    # The window's screen is only weakly referenced, too. Screens own their
+    # windows, not the other way around- so a window that outlives its screen
+    # (say, after State.wipe) doesn't keep the screen, viewport and desktop
+    # around with it. (See screen below.)
+    #
+    # Note: "applied" is whatever the tiler last put the window at, or None if
+    # something has happened to the window since. (See Tile.help_resize.)
+    #
+    __slots__ = (
+                 'id', 'xobj', '_screen', 'desktop', 'winclass', 'static', 'hidden',
+                 'x', 'y', 'width', 'height', 'realx', 'realy',
+                 'origx', 'origy', 'origwidth', 'origheight',
+                 'd_left', 'd_right', 'd_top', 'd_bottom',
+                 'applied', '_title', '__weakref__'
+                 )
+
     #------------------------------------------------------------------------------
     # STATIC METHODS
     #------------------------------------------------------------------------------
 
     #
-    # This method uses the State to scan for any new windows (not currently in
-    # the WINDOW state dict), and loads them into PyTyle. This is called at
-    # program start up, and also when a new window has been created.
+    # This method asks the State what changed in the window manager's client
+    # list (see State.update_client_list). Any new windows are loaded into
+    # PyTyle, and any windows that are gone are deleted. This is called at
+    # program start up (when every window is new), and also whenever the
+    # client list changes.
+    #
+    # Note: All the new windows are probed in one batch (see
+    # Probe.get_windows_by_id), so this costs about the same whether one
+    # window showed up or three hundred.
+    #
+    # Note 2: Only windows that were loaded (or rejected for good) are
+    # remembered in the client list. The rest are forgotten, and will be
+    # probed again the next time the client list changes.
     #
     @staticmethod
-    def load_new_windows():
-        wins = State.scan_new_windows()
-        for win in wins:
-            Window.load_window(win)
+    def reconcile_windows():
+        added, removed = State.update_client_list()
+
+        for attrs in PROBE.get_windows_by_id(added):
+            window_id = attrs['xobj'].id
+            if Window.load_window(window_id, attrs):
+                State.add_client(window_id)
+            else:
+                PROBE.forget_window_id(window_id)
+
+        for window_id in removed:
+            if window_id in State.get_windows():
+                State.get_windows()[window_id].delete()
+            else:
+                PROBE.forget_window_id(window_id)
 
     #
     # This loads a new window into PyTyle. It instantiates an object of this
@@ -71,21 +116,33 @@ class Window:
     # Also, it will make sure that it isn't a popup- otherwise it simply
     # won't be tiled.
     #
+    # Note 2: If the window has already been probed, pass its attributes
+    # along so we don't have to ask X again.
+    #
+    # Returns True if the window was loaded, or if we decided it should never
+    # be loaded (popups and filtered windows). Returns False if we couldn't
+    # tell yet- no attributes, or no desktop or screen to put it on.
+    #
     @staticmethod
-    def load_window(window_id):
-        attrs = PROBE.get_window_by_id(window_id)
-        if not attrs['popup'] and attrs['desktop'] in State.get_desktops():
-            for viewport in State.get_desktops()[attrs['desktop']].viewports.values():
-                if viewport.is_on_viewport(attrs['x'], attrs['y']):
-                    for screen in viewport.screens.values():
-                        if screen.is_on_screen(attrs['x'], attrs['y']):
-                            win = Window(screen, attrs)
-                            if not win.filtered():
-                                screen.add_window(win)
-                                screen.needs_tiling()
-
-                                if win.id == PROBE.get_active_window_id():
-                                    win.activate()
+    def load_window(window_id, attrs = None):
+        if not attrs:
+            attrs = PROBE.get_window_by_id(window_id)
+        if not attrs:
+            return False
+        if attrs['popup']:
+            return True
+        if attrs['desktop'] in State.get_desktops():
+            screen = State.get_desktops()[attrs['desktop']].find_screen(attrs['x'], attrs['y'])
+            if screen:
+                win = Window(screen, attrs)
+                if not win.filtered():
+                    screen.add_window(win)
+                    screen.needs_tiling()
+
+                    if win.id == PROBE.get_active_window_id():
+                        win.activate()
+                return True
+        return False
 
 
     #------------------------------------------------------------------------------
@@ -102,6 +159,8 @@ class Window:
         self.update_attributes(attrs)
         self.x = 0
         self.y = 0
+        self.realx = attrs['x']
+        self.realy = attrs['y']
         self.origx = attrs['x']
         self.origy = attrs['y']
         self.origwidth = self.width
@@ -152,6 +211,8 @@ class Window:
     # for tiling.
     #
     def delete(self):
+        if self.xobj:
+            PROBE.forget_window(self.xobj)
         self.screen.delete_window(self)
         self.screen.needs_tiling()
         State.reload_active()
@@ -172,23 +233,22 @@ class Window:
     # Note 3: VLC (and quite probably, some other programs) aren't
     # reporting a proper class. I need something else to search by.
     #
+    # Note 4: The filter is compiled when the config file is loaded, and
+    # the answer for each class is remembered. (See Config.is_filtered.)
+    #
     def filtered(self):
         if self.winclass:
-            for winfilter in Config.filter():
-                if self.winclass[0].lower().find(winfilter.lower()) != -1 or self.winclass[1].lower().find(winfilter.lower()) != -1: # or window.title.lower().find(winfilter.lower()) != -1:
-                    return True
+            return Config.is_filtered(self.winclass)
 
         return False
 
     #
-    # Tests to see if this window is still alive.
+    # Tests to see if this window is still alive. This is called *a lot*
+    # (see Screen.get_active), so it doesn't ask X- the Probe keeps track of
+    # which windows have been destroyed.
     #
     def lives(self):
-        try:
-            PROBE.get_window_geometry(self.xobj)
-        except:
-            return False
-        return True
+        return PROBE.is_alive(self.xobj)
 
     #
     # Asks the window manager to maximize the window. It does not currently
@@ -198,56 +258,89 @@ class Window:
         PROBE.window_maximize(self.xobj)
 
     #
-    # Refreshs the current window. It probes for new window information and
-    # updates the attributes on every call. It will then check if it has
-    # moved to another desktop or screen. If it has, then it will queue both
-    # the old and new screens to retile. It will then also update the State
-    # information with the new desktop, screen, and window- if it's active.
-    # See also the comments in the method for a few more interesting caveats.
+    # Only the window's _NET_WM_DESKTOP changed. One request.
+    #
+    # Note: If the property was deleted, the window stays where it is. If
+    # it's being withdrawn, the client list change will take care of it.
+    #
+    def refresh_desktop(self):
+        desktop = PROBE.get_window_desktop(self.xobj)
+        if desktop is None:
+            return
+
+        self.desktop = desktop
+        if self.relocate(self.realx, self.realy) and self.id == PROBE.get_active_window_id():
+            State.reload_active()
+
+    #
+    # The window was moved or resized. If the window manager told us where
+    # the window is (see Event.get_configure_position), then we don't need to
+    # ask X at all. Otherwise, it's one round trip for the geometry.
+    #
+    # Note: We only care about the window's new x,y (screen change?), not its
+    # new width and height. We're tiling, so we're in complete control of
+    # width and height. (The key here is that x/y *completely* determines
+    # which screen the window is on.) Some windows (like terminals, text
+    # editors, etc) set width_inc/height_inc hints which standards compliant
+    # window managers honor- like OpenBox. So the WM could be sizing a window
+    # slightly differently than what PyTyle thinks it's at, and if we took
+    # that size, it would change slightly on every update and mangle the
+    # window. YUCK. But since *something* other than us moved or resized
+    # the window, it isn't where the tiler put it anymore.
+    #
+    def refresh_geometry(self, position = None):
+        self.applied = None
+
+        if position and not PROBE.is_compiz():
+            x = position[0] - self.d_left
+            y = position[1] - self.d_top
+        else:
+            geom = PROBE.get_window_geometry(self.xobj)
+            x = geom['x']
+            y = geom['y']
+
+        if self.relocate(x, y) and self.id == PROBE.get_active_window_id():
+            State.reload_active()
+
+    #
+    # Only the window's state changed (i.e., it was iconified). One request.
+    #
+    def refresh_state(self):
+        oldstate = self.hidden
+        self.hidden = PROBE.get_window_hidden(self.xobj)
+        if oldstate != self.hidden:
+            self.applied = None
+            self.screen.needs_tiling()
+
+    #
+    # Tells the window where X says it is. If it's moved onto another screen
+    # (or its desktop changed), then it's moved to that screen and both
+    # screens are queued for tiling. Returns True if the window changed
+    # screens. If the window hasn't budged, this doesn't do anything.
     #
-    def refresh(self):
+    def relocate(self, x, y):
         oldscreen = self.screen
         oldviewport = oldscreen.viewport
         olddesk = oldviewport.desktop
-        oldstate = self.hidden
-        update = PROBE.get_window(self.xobj)
-
-        # So this is a little bit weird- we're updating the window, but while
-        # we care about it's new x,y (screen change?), we don't care about it's
-        # new width and height. We're tiling, so we're in complete control of
-        # width and height. (The key here is that x/y *completely* determines
-        # which screen the window is on.) Therefore, we don't update them- but
-        # why? It would seem harmless, except that some windows (like terminals,
-        # text editors, etc) set width_inc/height_inc hints which standards
-        # compliant window managers honor- like OpenBox. Therefore, the WM could
-        # be resizing the width/height of a given window slightly differently than
-        # what PyTyle thinks it's at. This causes the width/height to change slightly
-        # on each window update, and has a cascading effect that mangles the
-        # window's size. YUCK. (And these width_inc/height_inc hints seemingly
-        # cannot be reset.)
-        update['width'] = self.width
-        update['height'] = self.height
-        self.update_attributes(update)
-
-        if olddesk.id != self.desktop or not oldviewport.is_on_viewport(update['x'], update['y']) or not oldscreen.is_on_screen(update['x'], update['y']):
-            for viewport in State.get_desktops()[self.desktop].viewports.values():
-                if viewport.is_on_viewport(update['x'], update['y']):
-                    for screen in viewport.screens.values():
-                        if screen.is_on_screen(update['x'], update['y']):
-                            oldscreen.delete_window(self)
-                            screen.add_window(self)
-                            screen.needs_tiling()
-                            oldscreen.needs_tiling()
-                            self.screen = screen
-        elif oldstate != self.hidden:
-            self.screen.needs_tiling()
 
-        # If it's the active window, then make sure PyTyle knows that. We don't
-        # want to set input focus (well, it should already have it if X tells us
-        # it's the active window) because it will generate another window change
-        # event, and we end up in a positive feedback loop. Yuck.
-        if self.id == PROBE.get_active_window_id():
-            State.reload_active()
+        moved = x != self.realx or y != self.realy or olddesk.id != self.desktop
+        self.realx = x
+        self.realy = y
+
+        if not moved:
+            return False
+
+        if olddesk.id != self.desktop or not oldviewport.is_on_viewport(x, y) or not oldscreen.is_on_screen(x, y):
+            screen = State.get_desktops()[self.desktop].find_screen(x, y)
+            if screen:
+                oldscreen.delete_window(self)
+                screen.add_window(self)
+                screen.needs_tiling()
+                oldscreen.needs_tiling()
+                self.screen = screen
+            return True
+
+        return False
 
     #
     # Attempts to remove decorations on the window. It's currently only
@@ -293,17 +386,32 @@ class Window:
     # desktop/screen didn't change, PyTyle doesn't really care about it,
     # so nothing changes. So far though, nothing bad seems to have come
     # from it. PyTyle simply moves the window back to where it thinks it
-    # should be on the next tiling action.
+    # should be on the next tiling action. (Moving the window forgets where
+    # the tiler put it- see refresh_geometry.)
+    #
+    # Returns True if the window was actually resized, and False if the
+    # geometry was no good.
     #
     def resize(self, x, y, width, height):
         if width < 1 or height < 1 or not self.screen.is_in_screen(x, y, width, height):
-            return
+            return False
 
         PROBE.window_resize(self.xobj, x, y, width, height)
         self.x = x
         self.y = y
         self.width = width
         self.height = height
+        self.applied = None
+        return True
+
+    #
+    # Tells the Probe to re-read this window's gravity, so that it knows
+    # whether it can skip removing static gravity. (See
+    # Probe.sync_window_hints.)
+    #
+    def sync_hints(self):
+        if self.xobj:
+            PROBE.sync_window_hints(self.xobj)
 
     #
     # Asks the window to restore the window. This does not use the window's
@@ -341,6 +449,29 @@ class Window:
     def stack_raise(self):
         PROBE.window_stackabove(self.xobj)
 
+    #
+    # The window's title. We don't keep it around unless someone asks for it
+    # (sorting, debugging), and it's forgotten whenever the window is
+    # refreshed.
+    #
+    def _get_title(self):
+        if self._title is None:
+            self._title = PROBE.get_window_title(self.xobj) if self.xobj else ''
+        return self._title
+
+    title = property(_get_title)
+
+    #
+    # The screen that the window is on, or None if that screen is gone.
+    #
+    def _get_screen(self):
+        return self._screen() if self._screen else None
+
+    def _set_screen(self, screen):
+        self._screen = weakref.ref(screen) if screen else None
+
+    screen = property(_get_screen, _set_screen)
+
     #
     # Simply updates all the window attributes.
     #
@@ -355,15 +486,16 @@ class Window:
         self.d_top = attrs['d_top']
         self.d_bottom = attrs['d_bottom']
         self.desktop = attrs['desktop']
-        self.title = attrs['title']
+        self._title = None
         self.winclass = attrs['class']
         self.static = attrs['static']
         self.hidden = attrs['hidden']
         self.xobj = attrs['xobj'] if 'xobj' in attrs else None
+        self.applied = None
 
     #
     # A simple string representation of the window. Useful for some debugging
     # purposes. Also see the string representations of desktop and screen.
     #
     def __str__(self):
-        return self.title + ' - [ID: ' + str(self.id) + ', X: ' + str(self.x) + ', Y: ' + str(self.y) + ', WIDTH: ' + str(self.width) + ', HEIGHT: ' + str(self.height) + ', DESKTOP: ' + str(self.screen.viewport.desktop.id) + ', VIEWPORT: ' + str(self.screen.viewport.id) + ', SCREEN: ' + str(self.screen.id) + ']'
+        return self.title + ' - [ID: ' + hex(self.id) + ', X: ' + str(self.x) + ', Y: ' + str(self.y) + ', WIDTH: ' + str(self.width) + ', HEIGHT: ' + str(self.height) + ', DESKTOP: ' + str(self.screen.viewport.desktop.id) + ', VIEWPORT: ' + str(self.screen.viewport.id) + ', SCREEN: ' + str(self.screen.id) + ']'
@@ -0,0 +1,155 @@
+#!/usr/bin/python
+#===============================================================================
+# PyTyle - A manual tiling manager
+# Copyright (C) 2009  Andrew Gallant <andrew@pytyle.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#===============================================================================
+
+"""
+bench/memory.py
+
+Reports how much memory each Window, Screen, Viewport and Desktop costs. Run
+it from the top of the source tree:
+
+    python bench/memory.py [number of windows]
+
+The real classes are used, but the Probe is swapped out for a fake one
+(FakeProbe below) before anything imports it, so this doesn't need X. The
+fake hands out the same kind of attributes that the real Probe does: window
+classes are shared tuples (like Probe._intern_class), and every window has
+its own title, which is only fetched if someone asks for it.
+
+It reports:
+    1. The size of one instance of each class.
+    2. How much the process grows per window, for a whole screen full of
+       windows- before and after their titles are fetched. (This reads the
+       resident size from /proc, so it needs Linux.)
+    3. What the windows share (window classes, the weak reference to their
+       screen), and that the weak back references don't keep a desktop
+       alive once the State lets go of it (see State.wipe).
+"""
+
+import gc, os, resource, sys, types
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+#
+# Just enough of a Probe for building desktops, viewports, screens and
+# windows. (One desktop, one viewport, one monitor.)
+#
+class FakeProbe:
+    CLASSES = [('xterm', 'XTerm'), ('gvim', 'Gvim'), ('firefox', 'Firefox'), ('urxvt', 'URxvt')]
+
+    def __init__(self):
+        self._classes = {}
+
+    def is_compiz(self):
+        return False
+
+    def get_desktops(self):
+        return {0: {'id': 0, 'resx': 1920, 'resy': 1080, 'x': 0, 'y': 0, 'width': 1920, 'height': 1080, 'name': 'one'}}
+
+    def get_viewports(self):
+        return [{'id': 0, 'x': 0, 'y': 0}]
+
+    def get_screens(self):
+        return [{'id': 0, 'x': 0, 'y': 0, 'width': 1920, 'height': 1080}]
+
+    def get_window_title(self, win):
+        return 'Terminal - %s' % win
+
+    def window_listen(self, win):
+        pass
+
+    def get_window(self, id):
+        winclass = FakeProbe.CLASSES[id % len(FakeProbe.CLASSES)]
+        winclass = (intern(winclass[0]), intern(winclass[1]))
+        winclass = self._classes.setdefault(winclass, winclass)
+
+        return {
+                'id': id, 'x': 0, 'y': 0, 'width': 640, 'height': 480,
+                'd_left': 1, 'd_right': 1, 'd_top': 20, 'd_bottom': 1,
+                'desktop': 0, 'class': winclass, 'static': False,
+                'hidden': False, 'popup': False, 'xobj': id,
+                }
+
+probe = types.ModuleType('PyTyle.Probe')
+probe.PROBE = FakeProbe()
+sys.modules['PyTyle.Probe'] = probe
+
+from PyTyle.State import State
+from PyTyle.Desktop import Desktop
+from PyTyle.Window import Window
+
+#
+# The process' resident size right now, in bytes.
+#
+def resident():
+    gc.collect()
+    return int(open('/proc/self/statm').read().split()[1]) * resource.getpagesize()
+
+#
+# Only the object itself (and its __dict__, if it has one) is counted.
+#
+def size(obj):
+    ret = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        ret += sys.getsizeof(obj.__dict__)
+    return ret
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    # Not Desktop.load_desktops- that loads the tilers too, which we don't
+    # need.
+    desktop = Desktop(probe.PROBE.get_desktops()[0])
+    viewport = desktop.viewports[0]
+    screen = viewport.screens[0]
+    window = Window(screen, probe.PROBE.get_window(1))
+
+    print '%-10s %6s %8s %10s' % ('class', 'slots', 'bytes', '__dict__')
+    for obj in (window, screen, viewport, desktop):
+        print '%-10s %6d %7dB %10s' % (obj.__class__.__name__, len(obj.__class__.__slots__), size(obj), hasattr(obj, '__dict__') and 'yes' or 'no')
+
+    before = resident()
+    windows = []
+    for window_id in xrange(0x1000000, 0x1000000 + count):
+        window = Window(screen, probe.PROBE.get_window(window_id))
+        screen.add_window(window)
+        windows.append(window)
+    loaded = resident()
+
+    for window in windows:
+        window.title
+    titled = resident()
+
+    print
+    print '%d windows on one screen (growth in resident size):' % count
+    print '    loaded:           %6dKB (%d bytes per window)' % ((loaded - before) / 1024, (loaded - before) / count)
+    print '    titles fetched:   %6dKB (%d bytes per window)' % ((titled - before) / 1024, (titled - before) / count)
+
+    print
+    print 'Shared by all %d windows:' % count
+    print '    window classes:   %d tuples' % len(set([id(window.winclass) for window in windows]))
+    print '    screen weakrefs:  %d' % len(set([id(window._screen) for window in windows]))
+
+    State.wipe()
+    del desktop, viewport, screen, obj
+    gc.collect()
+    print '    after State.wipe, window.screen is %s' % windows[0].screen
+
+if __name__ == '__main__':
+    main()
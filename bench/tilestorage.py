@@ -0,0 +1,122 @@
+#!/usr/bin/python
+#===============================================================================
+# PyTyle - A manual tiling manager
+# Copyright (C) 2009  Andrew Gallant <andrew@pytyle.com>
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 59 Temple Place, Suite 330, Boston, MA  02111-1307  USA
+#===============================================================================
+
+"""
+bench/tilestorage.py
+
+A microbenchmark for TileStorage. It doesn't need X- the windows are fakes
+that only have what TileStorage looks at. Run it from the top of the source
+tree:
+
+    python bench/tilestorage.py [number of windows]
+
+It times the things that tilers do the most: filling the storage, reloading
+it (what Tile.help_reload does), reading the ordered lists, switching windows,
+windows coming and going, and emptying it again.
+"""
+
+import os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from PyTyle.TileStorage import TileStorage
+
+#
+# Just enough of a window for TileStorage.
+#
+class FakeWindow:
+    def __init__(self, id):
+        self.id = id
+        self.title = 'Window %d' % id
+        self.hidden = False
+
+#
+# Runs func "repeat" times, and prints the best time.
+#
+def bench(name, func, repeat = 5):
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        func()
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    print '%-30s %10.3f ms' % (name, best * 1000)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    windows = [FakeWindow(0x1000000 + i) for i in range(count)]
+
+    print 'TileStorage with %d windows' % count
+
+    def fill():
+        storage = TileStorage()
+        for window in windows:
+            storage.add_bottom(window)
+        return storage
+
+    # The same thing Tile.help_reload does when nothing changed.
+    def reload():
+        storage = fill()
+        for window in storage.get_all():
+            storage.contains(window)
+        for window in windows:
+            if not storage.contains(window):
+                storage.add_bottom(window)
+            else:
+                storage.try_to_promote(window)
+
+    def views():
+        storage = fill()
+        for window in windows:
+            storage.get_masters()
+            storage.get_slaves()
+            storage.get_all()
+
+    def switch():
+        storage = fill()
+        for i in range(count - 1):
+            storage.switch(windows[i], windows[i + 1])
+            storage.get_all()
+
+    # A window closes and another one opens, and the tiler looks again.
+    def churn():
+        storage = fill()
+        storage.get_all()
+        for window in windows[:count / 10]:
+            storage.remove(window)
+            storage.get_all()
+            storage.add_bottom(window)
+            storage.get_all()
+
+    def empty():
+        storage = fill()
+        for window in windows:
+            storage.remove(window)
+
+    bench('add_bottom', fill)
+    bench('help_reload pattern', reload)
+    bench('ordered views (cached)', views)
+    bench('switch + get_all', switch)
+    bench('remove/add + get_all', churn)
+    bench('remove', empty)
+
+if __name__ == '__main__':
+    main()